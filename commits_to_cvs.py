@@ -1,6 +1,7 @@
 #!/usr/bin/env python3.7
 
 import argparse
+import os
 import sys
 import re
 
@@ -75,6 +76,12 @@ def main(argv):
   parser.add_argument('--backups-dir', help='Path to dir where the script will put backups of the output-file if ' +
                                             'output-file already exists.')
   parser.add_argument('--backups-limit', type=int, help='Max number of backup files. By default, there\'s not limit')
+  parser.add_argument('--journal', action='store_true', help='If output-file already exists, append the output ' +
+                                                             'to its journal instead of rewriting the whole file. ' +
+                                                             'The journal is folded back into the file when it grows ' +
+                                                             'too big, or by compact_stats_journal.py.')
+  parser.add_argument('--compress-backups', action='store_true', help='Gzip backup files. Backups with same ' +
+                                                                     'contents are shared anyway.')
   options = parser.parse_args()
 
   start_date = extract_date_from(options.start_date)
@@ -88,7 +95,10 @@ def main(argv):
     commits += extract_commits_history(repo, start_date, end_date, authors)
   stats_cluster = convert_commits_to_stats_cluster(commits, aliases)
 
-  if options.extra_input_file is not None:
+  # The output file is merged with the new stats when they're written anyway
+  extra_input_is_output = (options.extra_input_file is not None and options.output_file is not None
+                           and os.path.abspath(options.extra_input_file) == os.path.abspath(options.output_file))
+  if options.extra_input_file is not None and not extra_input_is_output:
     file_stats_cluster = core.stats.stats_file_utils.load_from(options.extra_input_file)
     stats_cluster = stats_cluster.merge(file_stats_cluster, prioritized=stats_cluster)
 
@@ -96,9 +106,12 @@ def main(argv):
     core.stats.stats_file_utils.write_into(options.output_file,
                                 stats_cluster,
                                 options.backups_dir,
-                                options.backups_limit)
+                                options.backups_limit,
+                                options.journal,
+                                options.compress_backups)
   else:
-    print(str(stats_cluster))
+    stats_cluster.write_to(sys.stdout)
+    sys.stdout.write('\n')
 
 if __name__ == '__main__':
   sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3.7
+
+import argparse
+import sys
+
+import core.stats.stats_file_utils
+
+def main(argv):
+  parser = argparse.ArgumentParser(description='Folds journal of a stats file (see --journal of other scripts) ' +
+                                               'back into the stats file')
+  parser.add_argument('--file', required=True, help='Path to the stats file')
+  parser.add_argument('--backups-dir', help='Path to dir where the script will put backups of the file.')
+  parser.add_argument('--backups-limit', type=int, help='Max number of backup files. By default, there\'s not limit')
+  parser.add_argument('--compress-backups', action='store_true', help='Gzip backup files. Backups with same ' +
+                                                                     'contents are shared anyway.')
+  options = parser.parse_args()
+
+  core.stats.stats_file_utils.compact(options.file,
+                                      options.backups_dir,
+                                      options.backups_limit,
+                                      options.compress_backups)
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3.7
+
+import argparse
+import sys
+
+import core.stats.stats_file_utils as stats_file_utils
+from core.stats import binary_stats_file
+
+def main(argv):
+  parser = argparse.ArgumentParser(description='Converts a stats file between the text and the binary formats')
+  parser.add_argument('--input-file', required=True, help='Path to the stats file to convert')
+  parser.add_argument('--output-file', required=True, help='Path to the converted file. ' +
+                                            'Note that if the file already exists, it will be overwritten.')
+  parser.add_argument('--format', choices=['text', 'binary'],
+                      help='Format of the output-file. By default, the format opposite to the input-file one')
+  options = parser.parse_args()
+
+  stats_cluster = stats_file_utils.load_from(options.input_file)
+  if stats_cluster is None:
+    raise ValueError('No stats in {}'.format(options.input_file))
+  if options.format is None:
+    binary = not binary_stats_file.is_binary_file(options.input_file)
+  else:
+    binary = options.format == 'binary'
+  stats_file_utils.write_as(options.output_file, stats_cluster, binary)
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv[1:]))
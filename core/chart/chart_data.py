@@ -1,21 +1,15 @@
-from core.stats.stats_entry import StatsEntry
-
 from collections import OrderedDict
 from datetime import timedelta
-from itertools import *
 
-from core.stats.stats_metadata import StatsMetadata
 from core.stats.stat_column_type import StatColumnType
 
-def _ChartData__stats_to_chart_line_seeds(typed_entries, metadata):
+def _ChartData__stats_to_chart_line_seeds(stats_cluster):
   result = []
+  metadata = stats_cluster.metadata()
 
-  types = metadata.types()
-  types_extras = metadata.types_extras()
-  values_indexes = []
-  for indx, column_type in enumerate(types):
-    if column_type is StatColumnType.VALUE:
-      values_indexes.append(indx)
+  types = metadata.types_view()
+  types_extras = metadata.types_extras_view()
+  values_indexes = metadata.schema().indexes_of(StatColumnType.VALUE)
   if len(values_indexes) > 1:
     for indx in values_indexes:
       type_extra = types_extras[indx]
@@ -24,14 +18,18 @@ def _ChartData__stats_to_chart_line_seeds(typed_entries, metadata):
           + 'If there\'re more than 1 value, all values extras must be not empty. '
           + 'Metadata: {}').format(indx, str(metadata)))
 
-  entries = list(typed_entries)
-  earliest_date = min([entry.date() for entry in entries])
+  if len(stats_cluster) == 0:
+    raise ValueError('No entries to build chart lines of')
+  # Entries are sorted by date, the most recent first
+  earliest_date = stats_cluster.typed_entry_at(len(stats_cluster) - 1).date()
 
-  entry_id_func = lambda entry: entry.id()
   if StatColumnType.ID in types:
-    entries = sorted(entries, key=entry_id_func)
-  for entries_group_id, entries_group in groupby(entries, entry_id_func):
-    entries_group = list(entries_group)
+    # The ID index is built once per cluster, and is shared by all its charts
+    entries_groups = ((entries_id, stats_cluster.rows_for_id(entries_id).typed_entries())
+                      for entries_id in stats_cluster.ids())
+  else:
+    entries_groups = [(None, stats_cluster.typed_entries())]
+  for entries_group_id, entries_group in entries_groups:
     if len(values_indexes) > 0:
       for indx in values_indexes:
         if types_extras[indx] is None and entries_group_id is None:
@@ -55,8 +53,7 @@ def _ChartData__stats_to_chart_line_seeds(typed_entries, metadata):
 class ChartData:
   def __init__(self, stats_cluster, chart_modifier=None, title_base=''):
     self._lines = []
-    typed_entries, metadata = stats_cluster.typed_entries(), stats_cluster.metadata()
-    line_seeds = __stats_to_chart_line_seeds(typed_entries, metadata)
+    line_seeds = __stats_to_chart_line_seeds(stats_cluster)
     for seed in line_seeds:
       self._lines.append(seed.grow())
     if chart_modifier is not None:
@@ -1,5 +1,4 @@
-from core.chart.modifiers.chart_modifiers_composite import *
-from core.chart.chart_data import *
+from core.chart.chart_data import ChartData
 from core.chart.utils import extract_chart_modifiers_from_stats_metadata
 
 def _ChartsFamily__cluster_to_charts_data(stats_cluster, title_base):
@@ -13,4 +12,8 @@ class ChartsFamily:
     self._charts_data = __cluster_to_charts_data(stats_cluster, title_base)
 
   def charts_data(self):
-    return list(self._charts_data)
\ No newline at end of file
+    return list(self._charts_data)
+
+  # Same as charts_data(), but without copying
+  def iter_charts_data(self):
+    return iter(self._charts_data)
\ No newline at end of file
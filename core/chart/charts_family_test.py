@@ -53,4 +53,14 @@ date;id;value
     charts_data = charts_family.charts_data()
     # 1 chart data for original data without modifications,
     # and 1 for each appearnces (there're 2 appearances in metadata)
-    self.assertEqual(3, len(charts_data))
\ No newline at end of file
+    self.assertEqual(3, len(charts_data))
+
+  def test_iterated_charts_data_are_same_as_copied(self):
+    cluster_str = \
+'''
+date;id;value
+14/07/2019;danil;123
+14/07/2019;grisha;321
+'''
+    charts_family = ChartsFamily(StatsCluster.from_str(cluster_str), title_base='')
+    self.assertEqual(charts_family.charts_data(), list(charts_family.iter_charts_data()))
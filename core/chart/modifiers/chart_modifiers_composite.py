@@ -1,4 +1,4 @@
-from core.chart.modifiers.chart_modifier import *
+from core.chart.modifiers.chart_modifier import ChartModifier
 
 class ChartModifiersComposite(ChartModifier):
   def __init__(self, title, modifiers):
@@ -2,8 +2,8 @@ from enum import Enum
 from datetime import timedelta
 from datetime import datetime
 
-from core.chart.modifiers.chart_modifier import *
-from core.chart.chart_data import *
+from core.chart.modifiers.chart_modifier import ChartModifier
+from core.chart.chart_data import ChartLineData
 
 class DateBasisChartModifier(ChartModifier):
   class Unit(Enum):
@@ -2,8 +2,9 @@ from enum import Enum
 from collections import OrderedDict
 from datetime import datetime
 
-from core.chart.modifiers.chart_modifier import *
-from core.chart.chart_data import *
+from core.chart.modifiers.chart_modifier import ChartModifier
+from core.chart.chart_data import ChartLineData
+from core.stats.date_codec import DateCodec
 
 class PeriodChartModifier(ChartModifier):
   class Unit(Enum):
@@ -51,11 +52,11 @@ class PeriodChartModifier(ChartModifier):
         raise ValueError('Only accepting datetime as X type, received: {}'.format(type(x)))
     
     if self.time_unit is PeriodChartModifier.Unit.DAY:
-      grouping_fun = lambda date: date.strftime('%d/%m/%Y')
+      grouping_fun = DateCodec.date_to_str
     elif self.time_unit is PeriodChartModifier.Unit.MONTH:
-      grouping_fun = lambda date: date.strftime('%m/%Y')
+      grouping_fun = lambda date: DateCodec.date_to_str(date)[3:]
     elif self.time_unit is PeriodChartModifier.Unit.YEAR:
-      grouping_fun = lambda date: date.strftime('%Y')
+      grouping_fun = lambda date: DateCodec.date_to_str(date)[6:]
     else:
       raise ValueError('Unknown time unit: {}'.format(self.time_unit))
 
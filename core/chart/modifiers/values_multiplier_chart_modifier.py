@@ -1,5 +1,5 @@
-from core.chart.modifiers.chart_modifier import *
-from core.chart.chart_data import *
+from core.chart.modifiers.chart_modifier import ChartModifier
+from core.chart.chart_data import ChartLineData
 
 class ValuesMultiplierChartModifier(ChartModifier):
   def __init__(self, factor):
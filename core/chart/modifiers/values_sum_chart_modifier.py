@@ -1,5 +1,5 @@
-from core.chart.modifiers.chart_modifier import *
-from core.chart.chart_data import *
+from core.chart.modifiers.chart_modifier import ChartModifier
+from core.chart.chart_data import ChartLineData
 
 class ValuesSumChartModifier(ChartModifier):
   def __init__(self, new_line_name, sumed_lines_names):
@@ -12,7 +12,7 @@ class ValuesSumChartModifier(ChartModifier):
       return None
     sumed_lines_names = modifier_dict['sumed-lines-names']
     new_line_name = modifier_dict['new-line-name']
-    if not isinstance(sumed_lines_names, list):
+    if not isinstance(sumed_lines_names, (list, tuple)):
       raise ValueError('Values names expected to be a list: {}'.format(modifier_dict))
     if len(sumed_lines_names) == 0:
       raise ValueError('Empty sum not supported: {}'.format(modifier_dict))
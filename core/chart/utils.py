@@ -1,10 +1,10 @@
-from core.chart.modifiers.chart_modifiers_composite import *
-from core.chart.modifiers.moving_average_chart_modifier import *
-from core.chart.modifiers.period_chart_modifier import *
-from core.chart.modifiers.values_sum_chart_modifier import *
-from core.chart.modifiers.values_multiplier_chart_modifier import *
-from core.chart.modifiers.date_basis_chart_modifier import *
-from core.chart.modifiers.erase_zero_values_chart_modifier import *
+from core.chart.modifiers.chart_modifiers_composite import ChartModifiersComposite
+from core.chart.modifiers.moving_average_chart_modifier import MovingAverageChartModifier
+from core.chart.modifiers.period_chart_modifier import PeriodChartModifier
+from core.chart.modifiers.values_sum_chart_modifier import ValuesSumChartModifier
+from core.chart.modifiers.values_multiplier_chart_modifier import ValuesMultiplierChartModifier
+from core.chart.modifiers.date_basis_chart_modifier import DateBasisChartModifier
+from core.chart.modifiers.erase_zero_values_chart_modifier import EraseZeroValuesChartModifier
 
 def extract_chart_modifiers_from_stats_metadata(metadata):
   modifiers_fabrics = [
@@ -16,7 +16,7 @@ def extract_chart_modifiers_from_stats_metadata(metadata):
     lambda metadata_dict: EraseZeroValuesChartModifier.try_create_from(metadata_dict)
   ]
 
-  raw_metadata = metadata.raw_metadata()
+  raw_metadata = metadata.raw_metadata_view()
   modifiers = []
   for metadata_entry in raw_metadata:
     if metadata_entry['what'] == 'chart':
@@ -3,6 +3,8 @@ from core.stats.stats_entry import StatsEntry
 from core.stats.typed_stats_entry import TypedStatsEntry
 
 class Commit:
+  STATS_TYPES = [StatColumnType.DATE, StatColumnType.VALUE, StatColumnType.ID]
+
   def __init__(self, sha1, date, author, msg):
     self.sha1 = sha1
     self.date = date
@@ -10,5 +12,4 @@ class Commit:
     self.msg = msg
 
   def to_stats_entry(self):
-    return TypedStatsEntry.from_stats([StatColumnType.DATE, StatColumnType.VALUE, StatColumnType.ID],
-                                      [self.date,     1,              self.author])
+    return TypedStatsEntry.from_stats(Commit.STATS_TYPES, [self.date, 1, self.author])
@@ -9,7 +9,7 @@ from core.utils import check_call
 from core.utils import check_output
 from core.git.commit import Commit
 from core.stats.stats_entry import StatsEntry
-from core.stats.stats_cluster import StatsCluster
+from core.stats.stats_cluster_builder import StatsClusterBuilder
 from core.stats.stats_metadata import StatsMetadata
 
 def extract_commits_history(repo_path, start_date, end_date, authors = []):
@@ -62,16 +62,11 @@ def __reverse_authors_and_aliases(authors_and_aliases):
 # Aliases dict should have next format: {'author1':['alias1','alias2'], 'author2':['alias3']}
 def convert_commits_to_stats_cluster(commits, aliases={}):
   aliases_and_authors = __reverse_authors_and_aliases(aliases)
-  entries = []
-  for commit in commits:
-    if commit.author in aliases_and_authors:
-      commit = Commit(commit.sha1,
-                      commit.date,
-                      aliases_and_authors[commit.author],
-                      commit.msg)
-    entries.append(commit.to_stats_entry())
-
-  if len(entries) == 0:
+  if len(commits) == 0:
     return None
-  metadata = StatsMetadata(stat_column_types=entries[0].types)
-  return StatsCluster.from_typed_entries(entries, metadata).collapse()
+  metadata = StatsMetadata(stat_column_types=Commit.STATS_TYPES)
+  builder = StatsClusterBuilder(metadata)
+  for commit in commits:
+    author = aliases_and_authors.get(commit.author, commit.author)
+    builder.add([commit.date, 1, author])
+  return builder.build()
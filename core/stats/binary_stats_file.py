@@ -0,0 +1,139 @@
+import struct
+import sys
+
+from array import array
+
+from core.stats.stats_metadata import StatsMetadata
+from core.stats.stats_columns import StatsColumns
+from core.stats.stats_columns import _IdsDictionary
+from core.stats.stats_cluster import StatsCluster
+from core.stats.stat_column_type import StatColumnType
+
+# Binary stats file, all numbers are little-endian:
+#   MAGIC, version (uint32), flags (uint32)
+#   metadata: its str() as a string
+#   ID dictionary: count of IDs (uint32), strings of the IDs in order of their codes
+#   count of rows (uint32)
+#   columns in order of the metadata types:
+#     DATE: int32 day ordinals, VALUE: float64, ID: int32 codes, COMMENT: strings
+# Strings are written as a bulk: their lengths in bytes (uint32 each), then their UTF-8 bytes.
+# A single string is written as a bulk of one string.
+# Rows are written in order of the cluster, i.e. the most recent dates first.
+
+MAGIC = b'\x89GTDSTATS\n'
+VERSION = 1
+# Files with this extension are written in the binary format when created by stats_file_utils
+FILE_EXTENSION = '.statsbin'
+
+_FLAG_COLLAPSED = 1
+_UINT32 = struct.Struct('<I')
+_HEADER = struct.Struct('<II')
+_ARRAY_TYPECODES = {
+  StatColumnType.DATE: 'i',
+  StatColumnType.VALUE: 'd',
+  StatColumnType.ID: 'i',
+}
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+def is_binary_file(file_path):
+  with open(file_path, 'rb') as opened_file:
+    return opened_file.read(len(MAGIC)) == MAGIC
+
+def write(file, stats_cluster):
+  columns = stats_cluster._to_columns()
+  ids_dictionary = columns.ids_dictionary()
+  id_codes = None
+  id_indx = stats_cluster.metadata().schema().index_of(StatColumnType.ID)
+  if id_indx is not None:
+    id_codes = columns.raw_column_at(id_indx)
+    # The dictionary can be shared with other clusters, only used IDs are written
+    used_codes = sorted(set(id_codes))
+    if len(used_codes) < len(ids_dictionary):
+      new_codes = {code: new_code for new_code, code in enumerate(used_codes)}
+      id_codes = array('i', [new_codes[code] for code in id_codes])
+      ids_dictionary = _IdsDictionary.from_ids(ids_dictionary.id_of(code) for code in used_codes)
+
+  flags = _FLAG_COLLAPSED if stats_cluster.is_collapsed() else 0
+  file.write(MAGIC)
+  file.write(_HEADER.pack(VERSION, flags))
+  __write_strs(file, [str(stats_cluster.metadata())])
+  __write_strs(file, ids_dictionary.ids())
+  file.write(_UINT32.pack(len(columns)))
+  for indx, stat_column_type in enumerate(stats_cluster.metadata().types_view()):
+    raw_column = id_codes if indx == id_indx else columns.raw_column_at(indx)
+    if stat_column_type is StatColumnType.COMMENT:
+      __write_strs(file, raw_column)
+    else:
+      __write_array(file, raw_column)
+
+# If the metadata is given, the metadata of the file is not parsed
+def load(file, metadata=None):
+  flags = __read_header(file)
+  metadata_str = __read_strs(file)[0]
+  if metadata is None:
+    metadata = StatsMetadata.from_str(metadata_str)
+  ids_dictionary = _IdsDictionary.from_ids(__read_strs(file))
+  size = _UINT32.unpack(__read_exactly(file, _UINT32.size))[0]
+  raw_columns = []
+  for stat_column_type in metadata.types_view():
+    if stat_column_type is StatColumnType.COMMENT:
+      raw_columns.append(__read_strs(file))
+    else:
+      raw_columns.append(__read_array(file, _ARRAY_TYPECODES[stat_column_type], size))
+  id_indx = metadata.schema().index_of(StatColumnType.ID)
+  if (id_indx is not None and size > 0
+      and not 0 <= min(raw_columns[id_indx]) <= max(raw_columns[id_indx]) < len(ids_dictionary)):
+    raise ValueError('ID codes of the binary stats file are out of its dictionary')
+  columns = StatsColumns._from_raw_columns(metadata.schema(), ids_dictionary, raw_columns, size)
+  collapsed = True if flags & _FLAG_COLLAPSED else None
+  return StatsCluster._from_columns(metadata, columns, collapsed)
+
+# Only the metadata of the file is read
+def load_metadata(file):
+  __read_header(file)
+  return StatsMetadata.from_str(__read_strs(file)[0])
+
+# Returns flags of the file
+def __read_header(file):
+  if file.read(len(MAGIC)) != MAGIC:
+    raise ValueError('Not a binary stats file')
+  version, flags = _HEADER.unpack(__read_exactly(file, _HEADER.size))
+  if version != VERSION:
+    raise ValueError('Unsupported binary stats file version: {}'.format(version))
+  return flags
+
+def __write_array(file, raw_column):
+  if not _LITTLE_ENDIAN:
+    raw_column = array(raw_column.typecode, raw_column)
+    raw_column.byteswap()
+  raw_column.tofile(file)
+
+def __read_array(file, typecode, size):
+  raw_column = array(typecode)
+  raw_column.frombytes(__read_exactly(file, raw_column.itemsize * size))
+  if not _LITTLE_ENDIAN:
+    raw_column.byteswap()
+  return raw_column
+
+def __write_strs(file, strs):
+  encoded_strs = [string.encode('utf-8') for string in strs]
+  file.write(_UINT32.pack(len(encoded_strs)))
+  __write_array(file, array('I', [len(encoded_str) for encoded_str in encoded_strs]))
+  file.write(b''.join(encoded_strs))
+
+def __read_strs(file):
+  count = _UINT32.unpack(__read_exactly(file, _UINT32.size))[0]
+  lengths = __read_array(file, 'I', count)
+  data = __read_exactly(file, sum(lengths))
+  strs = []
+  offset = 0
+  for length in lengths:
+    strs.append(data[offset:offset+length].decode('utf-8'))
+    offset += length
+  return strs
+
+def __read_exactly(file, size):
+  data = file.read(size)
+  if len(data) != size:
+    raise ValueError('Binary stats file is truncated')
+  return data
@@ -0,0 +1,67 @@
+import unittest
+
+import io
+
+from core.stats import binary_stats_file
+from core.stats.stats_entry import StatsEntry
+from core.stats.stats_metadata import StatsMetadata
+from core.stats.stats_cluster import StatsCluster
+
+class BinaryStatsFileTests(unittest.TestCase):
+  def test_written_cluster_can_be_loaded(self):
+    metadata = StatsMetadata.from_str('date;value;id;comment')
+    stats_cluster = StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1.5;hello;first'),
+                                            StatsEntry.from_str('07/04/2019;2;мир;второй'),
+                                            StatsEntry.from_str('07/04/2019;3;hello;')])
+    binary = io.BytesIO()
+    binary_stats_file.write(binary, stats_cluster)
+    binary.seek(0)
+    loaded_cluster = binary_stats_file.load(binary)
+
+    self.assertEqual(metadata, loaded_cluster.metadata())
+    self.assertEqual(stats_cluster.entries(), loaded_cluster.entries())
+    self.assertEqual(str(stats_cluster), str(loaded_cluster))
+
+  def test_written_cluster_starts_with_magic(self):
+    stats_cluster = StatsCluster(StatsMetadata.from_str('date;value;id'), [])
+    binary = io.BytesIO()
+    binary_stats_file.write(binary, stats_cluster)
+    self.assertTrue(binary.getvalue().startswith(binary_stats_file.MAGIC))
+
+  def test_only_ids_of_cluster_are_written(self):
+    metadata = StatsMetadata.from_str('date;value;id')
+    stats_cluster = StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello'),
+                                            StatsEntry.from_str('07/04/2019;2;world')])
+    # The slice shares IDs of the whole cluster
+    stats_cluster = stats_cluster.slice(None, None, ['world'])
+    binary = io.BytesIO()
+    binary_stats_file.write(binary, stats_cluster)
+    self.assertFalse(b'hello' in binary.getvalue())
+    binary.seek(0)
+    self.assertEqual([StatsEntry.from_str('07/04/2019;2;world')], binary_stats_file.load(binary).entries())
+
+  def test_can_load_only_metadata(self):
+    metadata = StatsMetadata.from_str('date;value:sp;id')
+    binary = io.BytesIO()
+    binary_stats_file.write(binary, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello')]))
+    binary.seek(0)
+    self.assertEqual(metadata, binary_stats_file.load_metadata(binary))
+
+  def test_throws_when_truncated(self):
+    metadata = StatsMetadata.from_str('date;value;id')
+    binary = io.BytesIO()
+    binary_stats_file.write(binary, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello')]))
+    exception_caught = False
+    try:
+      binary_stats_file.load(io.BytesIO(binary.getvalue()[:-1]))
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_throws_when_not_binary(self):
+    exception_caught = False
+    try:
+      binary_stats_file.load(io.BytesIO(b'date;value;id\n06/04/2019;1;hello'))
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
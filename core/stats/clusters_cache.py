@@ -0,0 +1,97 @@
+import os
+import threading
+
+from collections import OrderedDict
+
+from core.stats import stats_file_utils
+from core.stats import stats_journal
+
+# In-process cache of clusters loaded by stats_file_utils.load_from(),
+# for processes which load same files many times.
+# A cached cluster is returned while its file and the file's journal have
+# same size and mtime, so a hit costs only a couple of stat() calls.
+# When the estimated memory of cached clusters exceeds the limit,
+# least recently used clusters are evicted.
+# Note that cached clusters are shared by all callers, and must not be modified.
+class ClustersCache:
+  def __init__(self, memory_limit):
+    self._memory_limit = memory_limit
+    self._memory = 0
+    # Absolute paths to (key, cluster, estimated size), least recently used first
+    self._clusters = OrderedDict()
+    self._hits = 0
+    self._misses = 0
+    self._evictions = 0
+    self._lock = threading.Lock()
+
+  # Same as stats_file_utils.load_from(), but with the cache
+  def load_from(self, file_path):
+    path = os.path.abspath(file_path)
+    key = __file_key_of(path)
+    with self._lock:
+      cached = self._clusters.get(path)
+      if cached is not None and cached[0] == key:
+        self._clusters.move_to_end(path)
+        self._hits += 1
+        return cached[1]
+      self._misses += 1
+
+    stats_cluster = stats_file_utils.load_from(path)
+    if stats_cluster is None:
+      self.invalidate(path)
+      return None
+    self.__put(path, key, stats_cluster)
+    return stats_cluster
+
+  def invalidate(self, file_path):
+    with self._lock:
+      cached = self._clusters.pop(os.path.abspath(file_path), None)
+      if cached is not None:
+        self._memory -= cached[2]
+
+  def clear(self):
+    with self._lock:
+      self._clusters.clear()
+      self._memory = 0
+
+  def __len__(self):
+    return len(self._clusters)
+
+  def hits(self):
+    return self._hits
+
+  def misses(self):
+    return self._misses
+
+  def evictions(self):
+    return self._evictions
+
+  # Estimated memory of cached clusters, in bytes
+  def memory(self):
+    return self._memory
+
+  def __put(self, path, key, stats_cluster):
+    size = stats_cluster.estimated_size()
+    with self._lock:
+      cached = self._clusters.pop(path, None)
+      if cached is not None:
+        self._memory -= cached[2]
+      if size > self._memory_limit:
+        return
+      self._clusters[path] = (key, stats_cluster, size)
+      self._memory += size
+      while self._memory > self._memory_limit:
+        evicted_path, evicted = self._clusters.popitem(last=False)
+        self._memory -= evicted[2]
+        self._evictions += 1
+
+# Size and mtime of the file and its journal, None for missing files
+def _ClustersCache__file_key_of(path):
+  return __stat_key_of(path), __stat_key_of(stats_journal.journal_path_of(path))
+
+def __stat_key_of(path):
+  try:
+    file_stat = os.stat(path)
+  except FileNotFoundError:
+    return None
+  return file_stat.st_size, file_stat.st_mtime_ns
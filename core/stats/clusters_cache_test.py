@@ -0,0 +1,83 @@
+import unittest
+from core import test_utils
+
+import os
+
+from core.stats import stats_file_utils
+from core.stats.clusters_cache import ClustersCache
+from core.stats.stats_entry import StatsEntry
+from core.stats.stats_metadata import StatsMetadata
+from core.stats.stats_cluster import StatsCluster
+
+class ClustersCacheTests(unittest.TestCase):
+  def test_loaded_cluster_is_cached(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    cache = ClustersCache(memory_limit=1024 * 1024)
+    stats_cluster = cache.load_from(file_path)
+    self.assertEqual([StatsEntry.from_str('06/04/2019;1;hello')], stats_cluster.entries())
+    self.assertTrue(stats_cluster is cache.load_from(file_path))
+    self.assertEqual(1, cache.hits())
+    self.assertEqual(1, cache.misses())
+    self.assertEqual(stats_cluster.estimated_size(), cache.memory())
+
+  def test_changed_file_is_loaded_again(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    cache = ClustersCache(memory_limit=1024 * 1024)
+    cache.load_from(file_path)
+    stats_file_utils.write_into(file_path,
+                                StatsCluster(StatsMetadata.from_str('date;value;id'),
+                                             [StatsEntry.from_str('07/04/2019;1;world')]))
+    self.assertEqual(2, len(cache.load_from(file_path)))
+    self.assertEqual(0, cache.hits())
+    self.assertEqual(2, cache.misses())
+
+  def test_changed_journal_is_loaded_again(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    cache = ClustersCache(memory_limit=1024 * 1024)
+    cache.load_from(file_path)
+    stats_file_utils.write_into(file_path,
+                                StatsCluster(StatsMetadata.from_str('date;value;id'),
+                                             [StatsEntry.from_str('07/04/2019;1;world')]),
+                                journal=True)
+    self.assertEqual(2, len(cache.load_from(file_path)))
+    self.assertEqual(0, cache.hits())
+
+  def test_least_recently_used_clusters_are_evicted(self):
+    dir_path = test_utils.make_tmp_dir()
+    file_paths = [test_utils.make_file_and_write(dir_path, 'date;value;id\n06/04/2019;1;hello')
+                  for indx in range(3)]
+    cluster_size = stats_file_utils.load_from(file_paths[0]).estimated_size()
+    cache = ClustersCache(memory_limit=cluster_size * 2)
+    cache.load_from(file_paths[0])
+    cache.load_from(file_paths[1])
+    cache.load_from(file_paths[0])
+    cache.load_from(file_paths[2])
+
+    self.assertEqual(2, len(cache))
+    self.assertEqual(1, cache.evictions())
+    cache.load_from(file_paths[0])
+    self.assertEqual(2, cache.hits())
+    cache.load_from(file_paths[1])
+    self.assertEqual(2, cache.hits())
+
+  def test_missing_file_is_not_cached(self):
+    cache = ClustersCache(memory_limit=1024 * 1024)
+    self.assertEqual(None, cache.load_from(os.path.join(test_utils.make_tmp_dir(), 'missing')))
+    self.assertEqual(0, len(cache))
+
+  def test_merging_cached_cluster_does_not_change_it(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    cache = ClustersCache(memory_limit=1024 * 1024)
+    stats_cluster = cache.load_from(file_path)
+    ids_dictionary = stats_cluster._to_columns().ids_dictionary()
+    cached_ids = ids_dictionary.ids()
+
+    other = StatsCluster.from_str('date;value;id\n06/04/2019;2;world\n07/04/2019;3;wonderful')
+    merged = stats_cluster.merge(other, prioritized=stats_cluster)
+    self.assertEqual(['hello', 'wonderful', 'world'], merged.ids())
+    concatenated = StatsCluster.concat([StatsCluster.from_str('date;value;id\n08/04/2019;1;other'), stats_cluster])
+    self.assertEqual(['hello', 'other'], concatenated.ids())
+
+    self.assertEqual(cached_ids, ids_dictionary.ids())
+    self.assertTrue(stats_cluster is cache.load_from(file_path))
+    self.assertEqual([StatsEntry.from_str('06/04/2019;1;hello')], stats_cluster.entries())
@@ -0,0 +1,76 @@
+from datetime import date
+from datetime import datetime
+
+# Converts dates to and from the dd/mm/yyyy format of stats files.
+# Days are passed around as day ordinals (see date.toordinal()). Strings and
+# datetimes of days are cached, so that all entries of same day share them
+# and strptime/strftime are not called for each entry.
+class DateCodec:
+  FORMAT = '%d/%m/%Y'
+  # Caches are cleared when they grow above the limit, normally stats files
+  # have way less different days.
+  _CACHE_LIMIT = 100000
+  _days_by_str = {}
+  _strs_by_day = {}
+  _dates_by_day = {}
+
+  @staticmethod
+  def str_to_day(date_str):
+    day = DateCodec._days_by_str.get(date_str)
+    if day is None:
+      day = DateCodec.__parse_day(date_str)
+      DateCodec.__put(DateCodec._days_by_str, date_str, day)
+    return day
+
+  @staticmethod
+  def __parse_day(date_str):
+    if (len(date_str) == 10 and date_str[2] == '/' and date_str[5] == '/'
+        and date_str[0:2].isdigit() and date_str[3:5].isdigit() and date_str[6:10].isdigit()):
+      try:
+        return date(int(date_str[6:10]), int(date_str[3:5]), int(date_str[0:2])).toordinal()
+      except ValueError:
+        pass # strptime will raise a proper error
+    # Not zero-padded dates and invalid strings
+    return datetime.strptime(date_str, DateCodec.FORMAT).toordinal()
+
+  @staticmethod
+  def day_to_str(day):
+    date_str = DateCodec._strs_by_day.get(day)
+    if date_str is None:
+      day_date = date.fromordinal(day)
+      date_str = '%02d/%02d/%04d'%(day_date.day, day_date.month, day_date.year)
+      DateCodec.__put(DateCodec._strs_by_day, day, date_str)
+    return date_str
+
+  # Midnight datetime of the day
+  @staticmethod
+  def day_to_date(day):
+    result = DateCodec._dates_by_day.get(day)
+    if result is None:
+      result = datetime.fromordinal(day)
+      DateCodec.__put(DateCodec._dates_by_day, day, result)
+    return result
+
+  @staticmethod
+  def date_to_day(date_time):
+    return date_time.toordinal()
+
+  @staticmethod
+  def str_to_date(date_str):
+    return DateCodec.day_to_date(DateCodec.str_to_day(date_str))
+
+  @staticmethod
+  def date_to_str(date_time):
+    return DateCodec.day_to_str(date_time.toordinal())
+
+  # Removes hours, minutes, seconds, etc.
+  # Note that time zone is removed, too, the day is taken as is.
+  @staticmethod
+  def truncate_to_day(date_time):
+    return DateCodec.day_to_date(date_time.toordinal())
+
+  @staticmethod
+  def __put(cache, key, value):
+    if len(cache) >= DateCodec._CACHE_LIMIT:
+      cache.clear()
+    cache[key] = value
@@ -0,0 +1,38 @@
+import unittest
+
+from datetime import datetime
+from datetime import timezone
+
+from core.stats.date_codec import DateCodec
+
+class DateCodecTests(unittest.TestCase):
+  def test_parses_dates(self):
+    self.assertEqual(datetime(2019, 4, 6).toordinal(), DateCodec.str_to_day('06/04/2019'))
+    self.assertEqual(datetime(2019, 4, 6), DateCodec.str_to_date('06/04/2019'))
+    self.assertEqual(datetime(2019, 12, 31), DateCodec.str_to_date('31/12/2019'))
+
+  def test_parses_not_zero_padded_dates(self):
+    self.assertEqual(datetime(2019, 4, 6), DateCodec.str_to_date('6/4/2019'))
+
+  def test_throws_on_invalid_dates(self):
+    for date_str in ['31/02/2019', '2019-04-06', 'aa/bb/cccc', '']:
+      exception_caught = False
+      try:
+        DateCodec.str_to_day(date_str)
+      except ValueError:
+        exception_caught = True
+      self.assertTrue(exception_caught, date_str)
+
+  def test_formats_dates(self):
+    self.assertEqual('06/04/2019', DateCodec.date_to_str(datetime(2019, 4, 6, 23, 59)))
+    self.assertEqual('06/04/2019', DateCodec.day_to_str(datetime(2019, 4, 6).toordinal()))
+
+  def test_same_days_share_objects(self):
+    day = datetime(2019, 4, 6).toordinal()
+    self.assertTrue(DateCodec.day_to_str(day) is DateCodec.day_to_str(day))
+    self.assertTrue(DateCodec.day_to_date(day) is DateCodec.str_to_date('06/04/2019'))
+
+  def test_truncates_to_day(self):
+    self.assertEqual(datetime(2019, 4, 6), DateCodec.truncate_to_day(datetime(2019, 4, 6, 13, 40, 1)))
+    aware_date = datetime(2019, 4, 6, 13, 40, tzinfo=timezone.utc)
+    self.assertEqual(datetime(2019, 4, 6), DateCodec.truncate_to_day(aware_date))
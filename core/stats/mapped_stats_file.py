@@ -0,0 +1,123 @@
+import mmap
+
+from array import array
+
+from core.stats.stats_entry import StatsEntry
+from core.stats.typed_stats_entry import TypedStatsEntry
+from core.stats.stats_metadata import StatsMetadata
+from core.stats.stats_columns import StatsColumns
+from core.stats.stats_cluster import StatsCluster
+
+_MappedStatsFile__WHITESPACES = b' \t\r\n\x0b\x0c'
+
+# Read-only memory-mapped stats file.
+# Only the metadata is parsed when the file is opened, for entries only
+# offsets of their lines are kept, so that they can be parsed on demand.
+# Note that entries are in order of the file, which is
+# the most recent dates first for files written by stats_file_utils.
+class MappedStatsFile:
+  def __init__(self, file_path):
+    # Offset of each entry line, the line ends with the next line break
+    self._offsets = array('Q')
+    self._metadata = None
+    self._map = None
+    self._file = open(file_path, 'rb')
+    try:
+      self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+      self.__read_metadata_and_offsets()
+    except BaseException:
+      self.close()
+      raise
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def close(self):
+    if self._map is not None:
+      self._map.close()
+    self._file.close()
+
+  def metadata(self):
+    return self._metadata
+
+  def __len__(self):
+    return len(self._offsets)
+
+  def entry_at(self, indx):
+    return StatsEntry.from_str(self.__line_at(self._offsets[indx]).strip())
+
+  def typed_entry_at(self, indx):
+    return TypedStatsEntry(self.entry_at(indx), self._metadata.schema())
+
+  # Entries from the start index (inclusive) to the end index (exclusive)
+  def entries(self, start=0, end=None):
+    if end is None:
+      end = len(self._offsets)
+    return [self.entry_at(indx) for indx in range(start, min(end, len(self._offsets)))]
+
+  # Parses all of the entries
+  def to_cluster(self):
+    columns = StatsColumns(self._metadata.schema())
+    for offset in self._offsets:
+      columns.append_strs(self.__line_at(offset).strip().split(';'))
+    return StatsCluster._from_columns(self._metadata, columns)
+
+  def __line_at(self, offset):
+    end = self._map.find(b'\n', offset)
+    if end == -1:
+      end = len(self._map)
+    return self._map[offset:end].decode('utf-8')
+
+  def __lines_offsets(self, start, end):
+    offset = start
+    while offset < end:
+      line_end = self._map.find(b'\n', offset, end)
+      if line_end == -1:
+        line_end = end
+      # Lines are rarely indented, so most of them are checked without copying
+      first_byte = self._map[offset:offset+1]
+      if line_end > offset and (first_byte not in __WHITESPACES
+                                or len(self._map[offset:line_end].strip()) > 0):
+        yield offset, line_end
+      offset = line_end + 1
+
+  def __read_metadata_and_offsets(self):
+    size = len(self._map)
+    lines = self.__lines_offsets(0, size)
+    first_line = next(lines, None)
+    if first_line is None:
+      raise ValueError('No metadata in the file')
+    first_line_str = self._map[first_line[0]:first_line[1]].decode('utf-8')
+
+    if first_line_str.strip().startswith('==='):
+      block_end = first_line[1]
+      for line_start, line_end in lines:
+        block_end = line_end
+        if self._map[line_start:line_end].strip().endswith(b'==='):
+          break
+      self._metadata = StatsMetadata.from_str(self._map[first_line[0]:block_end].decode('utf-8'))
+      self.__fill_offsets(lines)
+      return
+
+    try:
+      self._metadata = StatsMetadata.from_str(first_line_str)
+    except ValueError:
+      self._metadata = None
+    if self._metadata is not None:
+      self.__fill_offsets(lines)
+      return
+
+    # The first line is an entry, so the metadata must be in the end
+    block_end = self._map.rfind(b'===')
+    block_start = self._map.rfind(b'===', 0, block_end) if block_end != -1 else -1
+    if block_start == -1:
+      raise ValueError('No metadata in the file, first line: {}'.format(first_line_str))
+    self._metadata = StatsMetadata.from_str(self._map[block_start:block_end+3].decode('utf-8'))
+    self.__fill_offsets(self.__lines_offsets(0, block_start))
+
+  def __fill_offsets(self, lines):
+    for line_start, line_end in lines:
+      self._offsets.append(line_start)
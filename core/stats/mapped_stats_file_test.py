@@ -0,0 +1,51 @@
+import unittest
+from core import test_utils
+
+from core.stats.mapped_stats_file import MappedStatsFile
+from core.stats.stats_entry import StatsEntry
+from core.stats.stats_metadata import StatsMetadata
+
+class MappedStatsFileTests(unittest.TestCase):
+  def test_can_read_metadata_and_entries(self):
+    file_contents = 'date;value;id\n08/04/2019;3;hello\n\n  07/04/2019;2;world  \n06/04/2019;1;hello'
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), file_contents)
+    with MappedStatsFile(file_path) as stats_file:
+      self.assertEqual(StatsMetadata.from_str('date;value;id'), stats_file.metadata())
+      self.assertEqual(3, len(stats_file))
+      self.assertEqual(StatsEntry.from_str('08/04/2019;3;hello'), stats_file.entry_at(0))
+      self.assertEqual(StatsEntry.from_str('07/04/2019;2;world'), stats_file.entry_at(1))
+      self.assertEqual(StatsEntry.from_str('06/04/2019;1;hello'), stats_file.entry_at(2))
+      self.assertEqual('world', stats_file.typed_entry_at(1).id())
+      self.assertEqual([StatsEntry.from_str('07/04/2019;2;world')], stats_file.entries(1, 2))
+
+  def test_can_read_complex_metadata_in_the_beginning(self):
+    file_contents = '===\n- what: format\n  value: date;value;id\n===\n08/04/2019;3;hello\n07/04/2019;2;world\n'
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), file_contents)
+    with MappedStatsFile(file_path) as stats_file:
+      self.assertEqual(1, len(stats_file.metadata().raw_metadata()))
+      self.assertEqual(2, len(stats_file))
+      self.assertEqual(StatsEntry.from_str('07/04/2019;2;world'), stats_file.entry_at(1))
+
+  def test_can_read_complex_metadata_in_the_end(self):
+    file_contents = '06/04/2019;1;hello\n07/04/2019;2;world\n===\n- what: format\n  value: date;value;id\n===\n'
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), file_contents)
+    with MappedStatsFile(file_path) as stats_file:
+      self.assertEqual(1, len(stats_file.metadata().raw_metadata()))
+      self.assertEqual(2, len(stats_file))
+      self.assertEqual(StatsEntry.from_str('06/04/2019;1;hello'), stats_file.entry_at(0))
+
+  def test_can_be_converted_to_cluster(self):
+    file_contents = 'date;value;id\n06/04/2019;1;hello\n07/04/2019;2;world'
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), file_contents)
+    with MappedStatsFile(file_path) as stats_file:
+      cluster = stats_file.to_cluster()
+    self.assertEqual('date;value;id\n07/04/2019;2;world\n06/04/2019;1;hello', str(cluster))
+
+  def test_throws_when_no_metadata(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), '06/04/2000;1;hello')
+    exception_caught = False
+    try:
+      MappedStatsFile(file_path)
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
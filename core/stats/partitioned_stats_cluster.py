@@ -0,0 +1,132 @@
+from datetime import date
+from datetime import timedelta
+from itertools import chain
+
+from core.stats.stats_cluster import StatsCluster
+from core.stats.stat_column_type import StatColumnType
+from core.stats.date_codec import DateCodec
+
+# First day of the month of the day, as a date
+def __month_of(day):
+  day_date = date.fromordinal(day)
+  return date(day_date.year, day_date.month, 1)
+
+# Persistent collapsed stats, split into immutable StatsClusters by months.
+# A merge copies only the months touched by the merged cluster, other months
+# are shared with the merged PartitionedStatsCluster, which stays unchanged.
+# So merging small deltas into a long history takes time and memory
+# proportional to the deltas (and to the number of months), not to the history.
+# Partitions are made by StatsCluster.slice(), i.e. they're views of the
+# columns of the split cluster and aren't copied either.
+class PartitionedStatsCluster:
+  def __init__(self, metadata, partitions=()):
+    self._metadata = metadata
+    # Pairs of months and their not empty collapsed clusters, the most recent months first.
+    # Clusters without dates have a single partition with None month.
+    self._partitions = tuple(partitions)
+    self._size = sum(len(cluster) for month, cluster in self._partitions)
+
+  @staticmethod
+  def from_cluster(stats_cluster):
+    if not stats_cluster.is_collapsed():
+      raise ValueError('Cluster is not collapsed: {}'.format(stats_cluster))
+    metadata = stats_cluster.metadata()
+    return PartitionedStatsCluster(metadata, __split_by_months(stats_cluster))
+
+  def metadata(self):
+    return self._metadata
+
+  def __len__(self):
+    return self._size
+
+  # Clusters of the months, the most recent months first
+  def partitions(self):
+    return [cluster for month, cluster in self._partitions]
+
+  def is_collapsed(self):
+    return True
+
+  def iter_typed_entries(self):
+    return chain.from_iterable(cluster.iter_typed_entries() for month, cluster in self._partitions)
+
+  def iter_entries(self):
+    return chain.from_iterable(cluster.iter_entries() for month, cluster in self._partitions)
+
+  def entries(self):
+    return list(self.iter_entries())
+
+  # Single cluster of all of the entries, the entries are copied
+  def to_cluster(self):
+    if len(self._partitions) == 0:
+      return StatsCluster(self._metadata, [])
+    return StatsCluster.concat(self.partitions())
+
+  # Same as StatsCluster.slice(), only the months at the edges of the dates range are sliced,
+  # months within it are shared
+  def slice(self, start_date, end_date, ids=None):
+    partitions = []
+    for month, cluster in self._partitions:
+      if month is not None:
+        if start_date is not None and DateCodec.date_to_day(start_date) > __last_day_of(month):
+          break
+        if end_date is not None and DateCodec.date_to_day(end_date) < month.toordinal():
+          continue
+        if ((start_date is not None and DateCodec.date_to_day(start_date) > month.toordinal())
+            or (end_date is not None and DateCodec.date_to_day(end_date) < __last_day_of(month))
+            or ids is not None):
+          cluster = cluster.slice(start_date, end_date, ids)
+      elif start_date is not None or end_date is not None or ids is not None:
+        cluster = cluster.slice(start_date, end_date, ids)
+      if len(cluster) > 0:
+        partitions.append((month, cluster))
+    return PartitionedStatsCluster(self._metadata, partitions)
+
+  # Merges a collapsed cluster into a new PartitionedStatsCluster, entries of the
+  # cluster have priority over entries with same date and ID of self.
+  # Self is not changed.
+  def merge(self, stats_cluster):
+    if not stats_cluster.is_collapsed():
+      raise ValueError('Merged cluster is not collapsed: {}'.format(stats_cluster))
+    if stats_cluster.metadata() != self._metadata:
+      raise ValueError('Metadata of both clusters must be same, but it isn\'t: {}, {}'.format(
+        self._metadata, stats_cluster.metadata()))
+    merged_partitions = list(self._partitions)
+    for month, delta in __split_by_months(stats_cluster):
+      indx = __partition_index_of(merged_partitions, month)
+      if indx < len(merged_partitions) and merged_partitions[indx][0] == month:
+        merged = delta.merge(merged_partitions[indx][1], prioritized=delta)
+        merged_partitions[indx] = (month, merged)
+      else:
+        merged_partitions.insert(indx, (month, delta))
+    return PartitionedStatsCluster(self._metadata, merged_partitions)
+
+def _PartitionedStatsCluster__split_by_months(stats_cluster):
+  if len(stats_cluster) == 0:
+    return []
+  if stats_cluster.metadata().schema().index_of(StatColumnType.DATE) is None:
+    return [(None, stats_cluster)]
+  partitions = []
+  rest = stats_cluster
+  while len(rest) > 0:
+    # The most recent entry goes first
+    month = __month_of(DateCodec.date_to_day(rest.typed_entry_at(0).date()))
+    partitions.append((month, rest.slice(month, None)))
+    rest = rest.slice(None, month - timedelta(days=1))
+  return partitions
+
+def _PartitionedStatsCluster__last_day_of(month):
+  return __month_of(month.toordinal() + 31).toordinal() - 1
+
+# Index of the partition of the month, or the index where it must be inserted
+def _PartitionedStatsCluster__partition_index_of(partitions, month):
+  if month is None:
+    return 0
+  lo = 0
+  hi = len(partitions)
+  while lo < hi:
+    mid = (lo + hi) // 2
+    if partitions[mid][0] > month:
+      lo = mid + 1
+    else:
+      hi = mid
+  return lo
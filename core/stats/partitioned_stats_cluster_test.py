@@ -0,0 +1,75 @@
+import unittest
+
+from datetime import datetime
+
+from core.stats.partitioned_stats_cluster import PartitionedStatsCluster
+from core.stats.stats_cluster import StatsCluster
+from core.stats.stats_entry import StatsEntry
+
+class PartitionedStatsClusterTests(unittest.TestCase):
+  def test_cluster_is_split_by_months(self):
+    cluster = StatsCluster.from_str('date;value;id\n31/01/2019;1;a\n01/02/2019;2;a\n28/02/2019;3;b\n01/04/2019;4;a')
+    partitioned = PartitionedStatsCluster.from_cluster(cluster)
+    self.assertEqual(4, len(partitioned))
+    self.assertEqual([[StatsEntry.from_str('01/04/2019;4;a')],
+                      [StatsEntry.from_str('28/02/2019;3;b'), StatsEntry.from_str('01/02/2019;2;a')],
+                      [StatsEntry.from_str('31/01/2019;1;a')]],
+                     [partition.entries() for partition in partitioned.partitions()])
+    self.assertEqual(cluster.entries(), partitioned.entries())
+    self.assertEqual(str(cluster), str(partitioned.to_cluster()))
+
+  def test_merge_copies_only_touched_months(self):
+    cluster = StatsCluster.from_str('date;value;id\n31/01/2019;1;a\n01/02/2019;2;a\n28/02/2019;3;b')
+    partitioned = PartitionedStatsCluster.from_cluster(cluster)
+    delta = StatsCluster.from_str('date;value;id\n01/02/2019;5;a\n02/02/2019;1;a\n01/03/2019;1;b')
+    merged = partitioned.merge(delta)
+
+    expected = delta.merge(cluster, prioritized=delta)
+    self.assertEqual(expected.entries(), merged.entries())
+    self.assertEqual(3, len(merged.partitions()))
+    # January is not touched, so it's shared
+    self.assertIs(partitioned.partitions()[-1], merged.partitions()[-1])
+    # Merged cluster is not changed
+    self.assertEqual(cluster.entries(), partitioned.entries())
+
+  def test_merge_of_clusters_without_dates(self):
+    partitioned = PartitionedStatsCluster.from_cluster(StatsCluster.from_str('value;id\n1;a\n2;b'))
+    merged = partitioned.merge(StatsCluster.from_str('value;id\n3;a'))
+    self.assertEqual([StatsEntry.from_str('3;a'), StatsEntry.from_str('2;b')], merged.entries())
+
+  def test_merge_into_empty(self):
+    partitioned = PartitionedStatsCluster.from_cluster(StatsCluster.from_str('date;value;id'))
+    self.assertEqual(0, len(partitioned))
+    self.assertEqual('date;value;id', str(partitioned.to_cluster()))
+    merged = partitioned.merge(StatsCluster.from_str('date;value;id\n01/03/2019;1;b'))
+    self.assertEqual([StatsEntry.from_str('01/03/2019;1;b')], merged.entries())
+
+  def test_slice(self):
+    cluster = StatsCluster.from_str('date;value;id\n31/01/2019;1;a\n01/02/2019;2;a\n28/02/2019;3;b\n01/04/2019;4;a')
+    partitioned = PartitionedStatsCluster.from_cluster(cluster)
+    for start_date, end_date, ids in [(datetime(2019, 2, 1), None, None),
+                                      (None, datetime(2019, 2, 27), None),
+                                      (datetime(2019, 1, 31), datetime(2019, 3, 5), ['a']),
+                                      (datetime(2019, 3, 1), datetime(2019, 3, 5), None)]:
+      self.assertEqual(cluster.slice(start_date, end_date, ids).entries(),
+                       partitioned.slice(start_date, end_date, ids).entries())
+    sliced = partitioned.slice(datetime(2019, 2, 1), None)
+    self.assertIs(partitioned.partitions()[1], sliced.partitions()[1])
+
+  def test_throws_if_merged_cluster_not_collapsed(self):
+    partitioned = PartitionedStatsCluster.from_cluster(StatsCluster.from_str('date;value;id\n01/03/2019;1;b'))
+    exception_caught = False
+    try:
+      partitioned.merge(StatsCluster.from_str('date;value;id\n01/03/2019;1;b\n01/03/2019;1;b'))
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_throws_if_metadata_differs(self):
+    partitioned = PartitionedStatsCluster.from_cluster(StatsCluster.from_str('date;value;id\n01/03/2019;1;b'))
+    exception_caught = False
+    try:
+      partitioned.merge(StatsCluster.from_str('date;value:sp;id\n01/03/2019;1;b'))
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
@@ -0,0 +1,300 @@
+import os
+import shutil
+from bisect import bisect_left
+from datetime import datetime
+
+# Backups are named <file name>_<timestamp>_<content hash>.backup
+# (with .gz in the end if compressed), older backups without hashes
+# are named <file name>_<timestamp>.backup.
+# Backups with same content share the data: a backup with the same hash
+# as an older backup is a hard link to it. The stats file itself is copied,
+# not linked, because it can be modified in place.
+
+_BACKUP_SUFFIX = '.backup'
+_COMPRESSED_SUFFIX = '.gz'
+_HASH_CHUNK_SIZE = 1024 * 1024
+# Length of hex SHA-1
+_HASH_LENGTH = 40
+_MANIFEST_NAME = '.backups.manifest'
+# Removed backups records the manifest can have before it's rewritten
+_MANIFEST_REMOVED_RECORDS_LIMIT = 1024
+
+class Backup:
+  def __init__(self, file_name, source_name, timestamp, content_hash, size=None):
+    self.file_name = file_name
+    self.source_name = source_name
+    self.timestamp = timestamp
+    self.content_hash = content_hash
+    self.size = size
+
+  def compressed(self):
+    return self.file_name.endswith(_COMPRESSED_SUFFIX)
+
+  # None if the file name is not a backup name
+  @staticmethod
+  def try_parse(file_name):
+    backup_word_index = file_name.rfind(_BACKUP_SUFFIX)
+    if backup_word_index == -1:
+      return None
+    name_parts = file_name[:backup_word_index].rsplit('_', 2)
+    if len(name_parts) == 3 and __is_hash(name_parts[2]) and __is_float(name_parts[1]):
+      return Backup(file_name, name_parts[0], float(name_parts[1]), name_parts[2])
+    name_parts = file_name[:backup_word_index].rsplit('_', 1)
+    if len(name_parts) == 2 and __is_float(name_parts[1]):
+      return Backup(file_name, name_parts[0], float(name_parts[1]), None)
+    return None
+
+def _Backup__is_hash(string):
+  return len(string) == _HASH_LENGTH and all(c in '0123456789abcdef' for c in string)
+
+def _Backup__is_float(string):
+  try:
+    float(string)
+    return True
+  except ValueError:
+    return False
+
+def content_hash_of(file_path):
+  # hashlib and gzip are imported on use, to not slow down scripts startup
+  import hashlib
+  content_hash = hashlib.sha1()
+  with open(file_path, 'rb') as opened_file:
+    chunk = opened_file.read(_HASH_CHUNK_SIZE)
+    while len(chunk) > 0:
+      content_hash.update(chunk)
+      chunk = opened_file.read(_HASH_CHUNK_SIZE)
+  return content_hash.hexdigest()
+
+# Backups in the dir, oldest first
+def list_backups(backup_dir_path):
+  backups = []
+  for file_name in os.listdir(backup_dir_path):
+    backup = Backup.try_parse(file_name)
+    if backup is not None:
+      backups.append(backup)
+  return sorted(backups, key=lambda backup: backup.timestamp)
+
+def manifest_path_of(backup_dir_path):
+  # Backup.try_parse() doesn't take the manifest for a backup
+  return os.path.join(backup_dir_path, _MANIFEST_NAME)
+
+# Index of backups in a dir, so that the dir doesn't need to be listed
+# on each backup. It's kept in an append-only manifest (see manifest_path_of()),
+# each line of which is either
+# '+;<timestamp>;<hash>;<size>;<backup file name>' for an added backup
+# (the hash is empty for backups without it), or '-;<backup file name>' for a removed one.
+# If there's no manifest, it's built from the dir once.
+# Use catalog_of() to get the catalog, so that the manifest is read once per process.
+class BackupsCatalog:
+  def __init__(self, backup_dir_path):
+    self._manifest_path = manifest_path_of(backup_dir_path)
+    # Backups in order of adding, oldest first, backups before self._first are removed
+    self._backups = []
+    self._timestamps = []
+    self._first = 0
+    self._by_hash = {}
+    self._records_count = 0
+    # Size and mtime of the manifest after the last read or write of it
+    self._manifest_key = None
+    if os.path.exists(self._manifest_path):
+      self.__read_manifest()
+    else:
+      for backup in list_backups(backup_dir_path):
+        backup.size = os.path.getsize(os.path.join(backup_dir_path, backup.file_name))
+        self.__append(backup)
+      self.__rewrite_manifest()
+
+  # Whether the manifest wasn't changed since it was read or written by the catalog
+  def is_up_to_date(self):
+    return self._manifest_key == __manifest_key_of(self._manifest_path)
+
+  def __len__(self):
+    return len(self._backups) - self._first
+
+  # Backups, oldest first
+  def backups(self):
+    return self._backups[self._first:]
+
+  # The latest backup, optionally of the given file and made before the given timestamp
+  def latest(self, source_name=None, before=None):
+    end = len(self._backups)
+    if before is not None:
+      end = bisect_left(self._timestamps, before, self._first)
+    for indx in range(end - 1, self._first - 1, -1):
+      if source_name is None or self._backups[indx].source_name == source_name:
+        return self._backups[indx]
+    return None
+
+  def latest_with_hash(self, content_hash, compressed):
+    for backup in reversed(self._by_hash.get(content_hash, [])):
+      if backup.compressed() == compressed:
+        return backup
+    return None
+
+  def add(self, backup):
+    self.__append(backup)
+    self.__write_records([__added_record_of(backup)])
+
+  def remove_oldest(self):
+    backup = self._backups[self._first]
+    self._backups[self._first] = None
+    self._first += 1
+    if backup.content_hash is not None:
+      self._by_hash[backup.content_hash].remove(backup)
+    # Removed backups are dropped from the lists when they're half of them
+    if self._first * 2 > len(self._backups):
+      self._backups = self._backups[self._first:]
+      self._timestamps = self._timestamps[self._first:]
+      self._first = 0
+    self.__write_records(['-;{}'.format(backup.file_name)])
+    if self._records_count - len(self) > max(len(self), _MANIFEST_REMOVED_RECORDS_LIMIT):
+      self.__rewrite_manifest()
+    return backup
+
+  def __append(self, backup):
+    self._backups.append(backup)
+    self._timestamps.append(backup.timestamp)
+    if backup.content_hash is not None:
+      self._by_hash.setdefault(backup.content_hash, []).append(backup)
+
+  def __read_manifest(self):
+    # Backups by file names, in order of adding
+    backups = {}
+    with open(self._manifest_path, 'r') as manifest_file:
+      self.__read_records(manifest_file, backups)
+    for backup in backups.values():
+      self.__append(backup)
+    self._manifest_key = __manifest_key_of(self._manifest_path)
+
+  def __read_records(self, manifest_file, backups):
+    for line in manifest_file:
+      if line[0] == '+':
+        record = line.rstrip('\n').split(';', 4)
+        if len(record) != 5:
+          raise ValueError('Invalid manifest {} line: {}'.format(self._manifest_path, line))
+        timestamp, content_hash, size, file_name = record[1:]
+        # The name is <file name>_<timestamp>[_<hash>].backup[.gz]
+        name_parts = file_name[:file_name.rfind(_BACKUP_SUFFIX)].rsplit('_', 2 if content_hash else 1)
+        backups[file_name] = Backup(file_name, name_parts[0], float(timestamp),
+                                    content_hash if content_hash else None, int(size))
+      elif line[0] == '-':
+        backups.pop(line[2:].rstrip('\n'), None)
+      elif line == '\n':
+        continue
+      else:
+        raise ValueError('Invalid manifest {} line: {}'.format(self._manifest_path, line))
+      self._records_count += 1
+
+  def __write_records(self, records):
+    with open(self._manifest_path, 'a') as manifest_file:
+      for record in records:
+        manifest_file.write(record)
+        manifest_file.write('\n')
+    self._records_count += len(records)
+    self._manifest_key = __manifest_key_of(self._manifest_path)
+
+  def __rewrite_manifest(self):
+    tmp_manifest_path = self._manifest_path + '.tmp'
+    with open(tmp_manifest_path, 'w') as manifest_file:
+      for backup in self.backups():
+        manifest_file.write(__added_record_of(backup))
+        manifest_file.write('\n')
+    os.replace(tmp_manifest_path, self._manifest_path)
+    self._records_count = len(self)
+    self._manifest_key = __manifest_key_of(self._manifest_path)
+
+def _BackupsCatalog__added_record_of(backup):
+  content_hash = backup.content_hash if backup.content_hash is not None else ''
+  return '+;{};{};{};{}'.format(repr(backup.timestamp), content_hash, backup.size, backup.file_name)
+
+def _BackupsCatalog__manifest_key_of(manifest_path):
+  try:
+    manifest_stat = os.stat(manifest_path)
+  except FileNotFoundError:
+    return None
+  return manifest_stat.st_size, manifest_stat.st_mtime_ns
+
+# Catalogs by their manifests paths, see catalog_of()
+_catalogs = {}
+
+# Catalog of the dir, kept between calls while its manifest is changed only by it,
+# so that the manifest is not read again on each backup
+def catalog_of(backup_dir_path):
+  manifest_path = manifest_path_of(backup_dir_path)
+  catalog = _catalogs.get(manifest_path)
+  if catalog is None or not catalog.is_up_to_date():
+    catalog = BackupsCatalog(backup_dir_path)
+    _catalogs[manifest_path] = catalog
+  return catalog
+
+# The latest backup of the file made before the given timestamp, None if there's no such
+def latest_backup_before(backup_dir_path, file_path, timestamp):
+  if not os.path.exists(backup_dir_path):
+    return None
+  return catalog_of(backup_dir_path).latest(os.path.basename(file_path), timestamp)
+
+def __link_or_copy(src_path, dst_path):
+  try:
+    os.link(src_path, dst_path)
+  except OSError:
+    # Hard links are not supported by the file system
+    shutil.copy2(src_path, dst_path)
+
+def __compress(src_path, dst_path):
+  import gzip
+  with open(src_path, 'rb') as src_file, gzip.open(dst_path, 'wb') as dst_file:
+    shutil.copyfileobj(src_file, dst_file, _HASH_CHUNK_SIZE)
+
+def __is_same_file(file_path, backup_path):
+  file_stat = os.stat(file_path)
+  backup_stat = os.stat(backup_path)
+  return file_stat.st_size == backup_stat.st_size and file_stat.st_mtime_ns == backup_stat.st_mtime_ns
+
+# Makes a backup of the file, unless the latest backup of it has same content.
+# Returns file name of the new backup, or None if no backup is made.
+def make_backup(file_path, backup_dir_path, backups_limit=None, compress=False):
+  if not os.path.exists(file_path) or backup_dir_path is None:
+    return None
+  if not os.path.exists(backup_dir_path):
+    os.makedirs(backup_dir_path)
+
+  catalog = catalog_of(backup_dir_path)
+  file_name = os.path.basename(file_path)
+  latest_backup = catalog.latest(file_name)
+  if latest_backup is not None and not os.path.exists(os.path.join(backup_dir_path, latest_backup.file_name)):
+    latest_backup = None
+
+  # Cheap check first: copies keep mtime of the file
+  if (latest_backup is not None and not latest_backup.compressed()
+      and __is_same_file(file_path, os.path.join(backup_dir_path, latest_backup.file_name))):
+    return None
+  content_hash = content_hash_of(file_path)
+  if latest_backup is not None and latest_backup.content_hash == content_hash:
+    return None
+
+  if backups_limit is not None:
+    while len(catalog) > max(backups_limit - 1, 0):
+      removed_backup_path = os.path.join(backup_dir_path, catalog.remove_oldest().file_name)
+      if os.path.exists(removed_backup_path):
+        os.remove(removed_backup_path)
+
+  timestamp = datetime.now().timestamp()
+  backup_file_name = '{}_{}_{}{}'.format(file_name, str(timestamp), content_hash, _BACKUP_SUFFIX)
+  if compress:
+    backup_file_name += _COMPRESSED_SUFFIX
+  backup_file_path = os.path.join(backup_dir_path, backup_file_name)
+
+  same_content_backup = catalog.latest_with_hash(content_hash, compress)
+  if same_content_backup is not None:
+    same_content_backup_path = os.path.join(backup_dir_path, same_content_backup.file_name)
+    if not os.path.exists(same_content_backup_path):
+      same_content_backup = None
+  if same_content_backup is not None:
+    __link_or_copy(same_content_backup_path, backup_file_path)
+  elif compress:
+    __compress(file_path, backup_file_path)
+  else:
+    shutil.copy2(file_path, backup_file_path)
+  catalog.add(Backup(backup_file_name, file_name, timestamp, content_hash,
+                     os.path.getsize(backup_file_path)))
+  return backup_file_name
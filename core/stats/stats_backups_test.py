@@ -0,0 +1,174 @@
+import unittest
+from core import test_utils
+
+import gzip
+import os
+
+from core.stats import stats_backups
+from core.stats.stats_backups import Backup
+
+def _StatsBackupsTests__backup_of_size(file_name, size):
+  backup = Backup.try_parse(file_name)
+  backup.size = size
+  return backup
+
+# Names of backups in the dir, without the manifest
+def _StatsBackupsTests__backup_files_in(backup_dir_path):
+  return [backup.file_name for backup in stats_backups.list_backups(backup_dir_path)]
+
+class StatsBackupsTests(unittest.TestCase):
+  def test_backup_has_content_of_file(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    backup_folder = test_utils.make_tmp_dir()
+    backup_file_name = stats_backups.make_backup(file_path, backup_folder)
+    self.assertEqual([backup_file_name], __backup_files_in(backup_folder))
+    with open(os.path.join(backup_folder, backup_file_name), 'r') as opened_file:
+      self.assertEqual('date;value;id\n06/04/2019;1;hello', opened_file.read())
+
+  def test_no_backup_when_file_not_changed(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    backup_folder = test_utils.make_tmp_dir()
+    self.assertNotEqual(None, stats_backups.make_backup(file_path, backup_folder))
+    self.assertEqual(None, stats_backups.make_backup(file_path, backup_folder))
+    self.assertEqual(1, len(__backup_files_in(backup_folder)))
+
+  def test_no_backup_when_file_rewritten_with_same_content(self):
+    dir_path = test_utils.make_tmp_dir()
+    file_path = test_utils.make_file_and_write(dir_path, 'date;value;id\n06/04/2019;1;hello')
+    backup_folder = test_utils.make_tmp_dir()
+    stats_backups.make_backup(file_path, backup_folder)
+    os.remove(file_path)
+    with open(file_path, 'w') as opened_file:
+      opened_file.write('date;value;id\n06/04/2019;1;hello')
+    self.assertEqual(None, stats_backups.make_backup(file_path, backup_folder))
+    self.assertEqual(1, len(__backup_files_in(backup_folder)))
+
+  def test_backups_with_same_content_share_data(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    backup_folder = test_utils.make_tmp_dir()
+    first_backup = stats_backups.make_backup(file_path, backup_folder)
+    os.remove(file_path)
+    with open(file_path, 'w') as opened_file:
+      opened_file.write('date;value;id\n07/04/2019;1;hello')
+    stats_backups.make_backup(file_path, backup_folder)
+    os.remove(file_path)
+    with open(file_path, 'w') as opened_file:
+      opened_file.write('date;value;id\n06/04/2019;1;hello')
+    third_backup = stats_backups.make_backup(file_path, backup_folder)
+
+    self.assertEqual(3, len(__backup_files_in(backup_folder)))
+    self.assertTrue(os.path.samefile(os.path.join(backup_folder, first_backup),
+                                     os.path.join(backup_folder, third_backup)))
+
+  def test_can_compress_backups(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    backup_folder = test_utils.make_tmp_dir()
+    backup_file_name = stats_backups.make_backup(file_path, backup_folder, compress=True)
+    self.assertTrue(Backup.try_parse(backup_file_name).compressed())
+    with gzip.open(os.path.join(backup_folder, backup_file_name), 'rt') as opened_file:
+      self.assertEqual('date;value;id\n06/04/2019;1;hello', opened_file.read())
+    self.assertEqual(None, stats_backups.make_backup(file_path, backup_folder, compress=True))
+
+  def test_can_parse_backup_names(self):
+    content_hash = 'a' * 40
+    backup = Backup.try_parse('stats.csv_1554508800.5_{}.backup'.format(content_hash))
+    self.assertEqual('stats.csv', backup.source_name)
+    self.assertEqual(1554508800.5, backup.timestamp)
+    self.assertEqual(content_hash, backup.content_hash)
+    self.assertFalse(backup.compressed())
+
+    backup = Backup.try_parse('my_stats.csv_1554508800.5.backup')
+    self.assertEqual('my_stats.csv', backup.source_name)
+    self.assertEqual(1554508800.5, backup.timestamp)
+    self.assertEqual(None, backup.content_hash)
+
+    self.assertEqual(None, Backup.try_parse('stats.csv'))
+
+  def test_rotation_keeps_latest_backups(self):
+    dir_path = test_utils.make_tmp_dir()
+    backup_folder = test_utils.make_tmp_dir()
+    file_path = os.path.join(dir_path, 'stats.csv')
+    for indx in range(4):
+      with open(file_path, 'w') as opened_file:
+        opened_file.write('date;value;id\n0{}/04/2019;1;hello'.format(indx + 1))
+      stats_backups.make_backup(file_path, backup_folder, backups_limit=2)
+
+    backups = stats_backups.list_backups(backup_folder)
+    self.assertEqual(2, len(backups))
+    with open(os.path.join(backup_folder, backups[-1].file_name), 'r') as opened_file:
+      self.assertEqual('date;value;id\n04/04/2019;1;hello', opened_file.read())
+
+  def test_backups_are_recorded_in_manifest(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    backup_folder = test_utils.make_tmp_dir()
+    backup_file_name = stats_backups.make_backup(file_path, backup_folder)
+
+    backups = stats_backups.BackupsCatalog(backup_folder).backups()
+    self.assertEqual(1, len(backups))
+    self.assertEqual(backup_file_name, backups[0].file_name)
+    self.assertEqual(os.path.basename(file_path), backups[0].source_name)
+    self.assertEqual(len('date;value;id\n06/04/2019;1;hello'), backups[0].size)
+    self.assertEqual(stats_backups.content_hash_of(file_path), backups[0].content_hash)
+
+  def test_manifest_is_built_from_existing_backups(self):
+    backup_folder = test_utils.make_tmp_dir()
+    for backup_file_name in ['stats.csv_1554508800.0.backup', 'stats.csv_1554595200.0.backup']:
+      with open(os.path.join(backup_folder, backup_file_name), 'w') as opened_file:
+        opened_file.write('date;value;id')
+    self.assertFalse(os.path.exists(stats_backups.manifest_path_of(backup_folder)))
+
+    catalog = stats_backups.BackupsCatalog(backup_folder)
+    self.assertEqual(2, len(catalog))
+    self.assertTrue(os.path.exists(stats_backups.manifest_path_of(backup_folder)))
+    # The manifest is in the dir, with the backups
+    self.assertEqual(sorted(['.backups.manifest', 'stats.csv_1554508800.0.backup', 'stats.csv_1554595200.0.backup']),
+                     sorted(os.listdir(backup_folder)))
+    self.assertEqual('stats.csv_1554595200.0.backup', catalog.latest('stats.csv').file_name)
+
+  def test_can_find_latest_backup_before_timestamp(self):
+    backup_folder = test_utils.make_tmp_dir()
+    catalog = stats_backups.BackupsCatalog(backup_folder)
+    for backup_file_name in ['stats.csv_100.0.backup', 'other.csv_150.0.backup', 'stats.csv_200.0.backup']:
+      catalog.add(__backup_of_size(backup_file_name, 1))
+
+    self.assertEqual(None, stats_backups.latest_backup_before(backup_folder, 'stats.csv', 100.0))
+    self.assertEqual('stats.csv_100.0.backup',
+                     stats_backups.latest_backup_before(backup_folder, 'stats.csv', 199.0).file_name)
+    self.assertEqual('stats.csv_200.0.backup',
+                     stats_backups.latest_backup_before(backup_folder, 'stats.csv', 201.0).file_name)
+    self.assertEqual('other.csv_150.0.backup',
+                     stats_backups.latest_backup_before(backup_folder, 'other.csv', 201.0).file_name)
+
+  def test_removed_backups_are_not_in_manifest(self):
+    backup_folder = test_utils.make_tmp_dir()
+    catalog = stats_backups.BackupsCatalog(backup_folder)
+    for indx in range(5):
+      catalog.add(__backup_of_size('stats.csv_{}.0.backup'.format(indx), 1))
+    self.assertEqual('stats.csv_0.0.backup', catalog.remove_oldest().file_name)
+    self.assertEqual('stats.csv_1.0.backup', catalog.remove_oldest().file_name)
+
+    backups = stats_backups.BackupsCatalog(backup_folder).backups()
+    self.assertEqual(['stats.csv_2.0.backup', 'stats.csv_3.0.backup', 'stats.csv_4.0.backup'],
+                     [backup.file_name for backup in backups])
+
+  def test_rotation_does_not_read_manifest_again(self):
+    dir_path = test_utils.make_tmp_dir()
+    backup_folder = test_utils.make_tmp_dir()
+    file_path = os.path.join(dir_path, 'stats.csv')
+    catalog = None
+    for indx in range(20):
+      with open(file_path, 'w') as opened_file:
+        opened_file.write('date;value;id\n06/04/2019;{};hello'.format(indx))
+      stats_backups.make_backup(file_path, backup_folder, backups_limit=3)
+      if catalog is None:
+        catalog = stats_backups.catalog_of(backup_folder)
+      # Same catalog, so the rotation costs the same however many backups the manifest has
+      self.assertIs(catalog, stats_backups.catalog_of(backup_folder))
+    self.assertEqual(3, len(catalog))
+    self.assertEqual(3, len(__backup_files_in(backup_folder)))
+
+    # Changes made by others are noticed
+    other_catalog = stats_backups.BackupsCatalog(backup_folder)
+    other_catalog.remove_oldest()
+    self.assertIsNot(catalog, stats_backups.catalog_of(backup_folder))
+    self.assertEqual(2, len(stats_backups.catalog_of(backup_folder)))
@@ -0,0 +1,103 @@
+import json
+import os
+
+from core.stats.stats_metadata import StatsMetadata
+from core.stats.stat_column_type import StatColumnType
+from core.stats import binary_stats_file
+from core.stats import stats_backups
+
+# Cache of a parsed stats file is a file next to it, so that unchanged
+# stats files are not parsed again on each load.
+# The cache starts with a JSON line with the key of the stats file and its
+# already parsed metadata, the cluster itself is in the binary format (see binary_stats_file).
+# The cache is valid while the stats file has same path, size and mtime,
+# or same content hash if the file was rewritten with same contents.
+# Note that the cache is of the stats file only, its journal is applied after loading.
+
+VERSION = 1
+
+def cache_path_of(file_path):
+  return file_path + '.cache'
+
+# The cached cluster of the file, None if there's no valid cache
+def load(file_path):
+  cache_path = cache_path_of(file_path)
+  if not os.path.exists(cache_path):
+    return None
+  file_stat = os.stat(file_path)
+  with open(cache_path, 'rb') as cache_file:
+    try:
+      header = json.loads(cache_file.readline().decode('utf-8'))
+    except ValueError:
+      return None
+    if not __is_header_valid(header, file_path, file_stat):
+      return None
+    try:
+      stats_cluster = binary_stats_file.load(cache_file, __metadata_from_json(header['metadata']))
+    except ValueError:
+      return None
+  if header['mtime_ns'] != file_stat.st_mtime_ns:
+    # Same contents but rewritten, the key is updated so that the file is not hashed next time
+    try:
+      store(file_path, stats_cluster)
+    except OSError:
+      pass # The cache is not writable, it's valid anyway
+  return stats_cluster
+
+def store(file_path, stats_cluster):
+  file_stat = os.stat(file_path)
+  header = {
+    'version': VERSION,
+    'path': os.path.abspath(file_path),
+    'size': file_stat.st_size,
+    'mtime_ns': file_stat.st_mtime_ns,
+    'hash': stats_backups.content_hash_of(file_path),
+    'metadata': __metadata_to_json(stats_cluster.metadata()),
+  }
+  cache_path = cache_path_of(file_path)
+  tmp_cache_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+  try:
+    with open(tmp_cache_path, 'wb') as cache_file:
+      cache_file.write(json.dumps(header).encode('utf-8'))
+      cache_file.write(b'\n')
+      binary_stats_file.write(cache_file, stats_cluster)
+    os.replace(tmp_cache_path, cache_path)
+  except BaseException:
+    if os.path.isfile(tmp_cache_path):
+      os.remove(tmp_cache_path)
+    raise
+
+def remove(file_path):
+  cache_path = cache_path_of(file_path)
+  if os.path.exists(cache_path):
+    os.remove(cache_path)
+
+def __is_header_valid(header, file_path, file_stat):
+  if not isinstance(header, dict) or header.get('version') != VERSION:
+    return False
+  if header.get('path') != os.path.abspath(file_path) or header.get('size') != file_stat.st_size:
+    return False
+  if header.get('mtime_ns') == file_stat.st_mtime_ns:
+    return True
+  return header.get('hash') == stats_backups.content_hash_of(file_path)
+
+# None if the metadata cannot be restored from JSON exactly,
+# then it's parsed from the binary data
+def __metadata_to_json(metadata):
+  metadata_json = {
+    'types': [str(stat_column_type) for stat_column_type in metadata.types_view()],
+    'types_extras': metadata.types_extras(),
+    'raw_metadata': metadata.raw_metadata(),
+  }
+  try:
+    if json.loads(json.dumps(metadata_json)) == metadata_json:
+      return metadata_json
+  except (TypeError, ValueError):
+    pass
+  return None
+
+def __metadata_from_json(metadata_json):
+  if metadata_json is None:
+    return None
+  types = [StatColumnType.from_str(type_str) for type_str in metadata_json['types']]
+  return StatsMetadata(types, metadata_json['types_extras'], metadata_json['raw_metadata'])
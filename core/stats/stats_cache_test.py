@@ -0,0 +1,45 @@
+import unittest
+from core import test_utils
+
+import os
+
+from core.stats import stats_cache
+from core.stats.stats_entry import StatsEntry
+from core.stats.stats_cluster import StatsCluster
+
+class StatsCacheTests(unittest.TestCase):
+  def test_cached_cluster_can_be_loaded(self):
+    file_contents = '===\n- what: format\n  value: date;value:sp;id\n- what: title\n  value: hello\n===\n06/04/2019;1;hello'
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), file_contents)
+    stats_cluster = StatsCluster.from_str(file_contents)
+    self.assertEqual(None, stats_cache.load(file_path))
+
+    stats_cache.store(file_path, stats_cluster)
+    cached_cluster = stats_cache.load(file_path)
+    self.assertEqual(stats_cluster.metadata(), cached_cluster.metadata())
+    self.assertEqual(stats_cluster.metadata().raw_metadata(), cached_cluster.metadata().raw_metadata())
+    self.assertEqual(stats_cluster.entries(), cached_cluster.entries())
+
+  def test_cache_is_invalid_when_file_changed(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    stats_cache.store(file_path, StatsCluster.from_str('date;value;id\n06/04/2019;1;hello'))
+    with open(file_path, 'w') as opened_file:
+      opened_file.write('date;value;id\n06/04/2019;2;hello')
+    os.utime(file_path, ns=(0, 0))
+    self.assertEqual(None, stats_cache.load(file_path))
+
+  def test_cache_is_valid_when_file_rewritten_with_same_content(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    stats_cache.store(file_path, StatsCluster.from_str('date;value;id\n06/04/2019;1;hello'))
+    os.utime(file_path, ns=(0, 0))
+    cached_cluster = stats_cache.load(file_path)
+    self.assertEqual([StatsEntry.from_str('06/04/2019;1;hello')], cached_cluster.entries())
+
+  def test_cache_is_invalid_when_corrupted(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    stats_cache.store(file_path, StatsCluster.from_str('date;value;id\n06/04/2019;1;hello'))
+    with open(stats_cache.cache_path_of(file_path), 'rb') as cache_file:
+      cache = cache_file.read()
+    with open(stats_cache.cache_path_of(file_path), 'wb') as cache_file:
+      cache_file.write(cache[:-3])
+    self.assertEqual(None, stats_cache.load(file_path))
@@ -1,15 +1,58 @@
-from core.stats.typed_stats_entry import TypedStatsEntry
+import heapq
+import io
+import sys
+
+from enum import Enum
+from itertools import chain
+
 from core.stats.stats_metadata import StatsMetadata
-from core.stats.stats_entry import StatsEntry
+from core.stats.stats_columns import StatsColumns
 from core.stats.stat_column_type import StatColumnType
+from core.stats.date_codec import DateCodec
+
+def _StatsCluster__entries_to_columns(metadata, stats_entries, typed_stats_entries):
+  columns = StatsColumns(metadata.schema())
+  if typed_stats_entries is not None:
+    # Typed entries might already have parsed columns
+    for typed_entry in typed_stats_entries:
+      columns.append_typed_entry(typed_entry)
+  else:
+    for entry in stats_entries:
+      columns.append_entry(entry)
+  return columns
 
-def _StatsCluster__entries_to_typed_entries(metadata, stats_entries):
-  result = []
-  for entry in stats_entries:
-    result.append(TypedStatsEntry(entry, metadata.types()))
-  return result
+def _StatsCluster__read_metadata_block(first_line, lines):
+  block_lines = [first_line]
+  for line in lines:
+    block_lines.append(line)
+    if line.strip().endswith('==='):
+      break
+  if len(block_lines) == 1 or not block_lines[-1].strip().endswith('==='):
+    raise ValueError('Metadata str starts with === but doesn\'t end with it: {}'.format('\n'.join(block_lines)))
+  return '\n'.join(block_lines)
 
+def _StatsCluster__lines_to_columns(metadata, lines, rows_filter):
+  columns = StatsColumns(metadata.schema())
+  if rows_filter is None or rows_filter.is_empty():
+    for line in lines:
+      columns.append_strs(line.strip().split(';'))
+    return columns
+  predicate = rows_filter.strs_predicate(metadata.schema())
+  for line in lines:
+    columns_strs = line.strip().split(';')
+    if predicate(columns_strs):
+      columns.append_strs(columns_strs)
+  return columns
+
+# Stats entries are kept in columns (see StatsColumns), sorted by date,
+# most recent dates first. Entries objects are created only when asked for.
 class StatsCluster:
+  # How collapse() handles COMMENT columns
+  class CommentsMode(Enum):
+    DROP = 1
+    FIRST = 2
+    JOIN = 3
+
   def __init__(self, metadata, stats_entries, typed_stats_entries=None):
     if typed_stats_entries is not None:
       if len(typed_stats_entries) != len(stats_entries):
@@ -18,120 +61,271 @@ class StatsCluster:
         if stats_entries[indx] != typed_stats_entries[indx].not_typed:
           raise ValueError('Given typed stats entries differ from not typed: {}, {}'.format(typed_stats_entries, stats_entries))
     self._metadata = metadata
-    self._stats_entries = stats_entries
-    self._typed_stats_entries = typed_stats_entries
-    if self._typed_stats_entries is None:
-      self._typed_stats_entries = __entries_to_typed_entries(metadata, stats_entries)
-
-    # Sorting
-    self._typed_stats_entries = sorted(self._typed_stats_entries, key=lambda entry: entry.date(), reverse=True)
-    # Constructing sorted not-typed entries list
-    stats_entries = []
-    for entry in self._typed_stats_entries:
-      stats_entries.append(entry.not_typed)
-    self._stats_entries = stats_entries
+    self._columns = __entries_to_columns(metadata, stats_entries, typed_stats_entries).sorted_by_date()
+    # Rows of the columns which belong to the cluster, see slice()
+    self._rows = range(len(self._columns))
+    # Whether entries have unique (date, id) pairs, None if not verified yet
+    self._collapsed = None
+    # ID codes to rows with the ID, built on first use, see rows_for_id()
+    self._ids_index = None
 
+  # Trusted constructor for columns made by the stats package: unlike __init__(),
+  # nothing is validated, and the columns are sorted only if they're not sorted already.
+  @staticmethod
+  def _from_columns(metadata, columns, collapsed=None):
+    columns = columns.sorted_by_date()
+    return StatsCluster.__view_of(metadata, columns, range(len(columns)), collapsed)
+
+  # Cluster sharing given columns, rows must be in the sorted order
+  @staticmethod
+  def __view_of(metadata, columns, rows, collapsed=None):
+    cluster = StatsCluster.__new__(StatsCluster)
+    cluster._metadata = metadata
+    cluster._columns = columns
+    cluster._rows = rows
+    cluster._collapsed = collapsed
+    cluster._ids_index = None
+    return cluster
+
+  # Typed entries are consistent with their not typed entries by construction,
+  # so they're not validated
   @staticmethod
   def from_typed_entries(typed_entries, metadata):
-    entries = []
-    for typed_entry in typed_entries:
-      entries.append(typed_entry.not_typed)
-    return StatsCluster(metadata, entries, typed_entries)
+    return StatsCluster._from_columns(metadata, __entries_to_columns(metadata, None, typed_entries))
 
   @staticmethod
   def from_str(string):
-    lines = string.split('\n')
-    lines = [line for line in lines if len(line.strip()) > 0]
-    string = '\n'.join(lines)
-
-    first_line_break = string.find('\n')
-    if first_line_break >= 0:
-      metadata_start, metadata_end = StatsMetadata.find_str_position(string)
-      metadata_str = string[metadata_start:metadata_end]
-      all_entries_str = string[0:metadata_start]+string[metadata_end:]
-    else:
-      metadata_str = string
-      all_entries_str = ''
-
-    entries_strs = all_entries_str.split('\n')
-    entries_strs = [entry.strip() for entry in entries_strs]
-    entries_strs = [entry for entry in entries_strs if len(entry) > 0]
-    entries = []
-    for entry_str in entries_strs:
-      entries.append(StatsEntry.from_str(entry_str))
-    return StatsCluster(StatsMetadata.from_str(metadata_str), entries)
- 
+    return StatsCluster.from_lines(io.StringIO(string))
+
+  # Loads the cluster from an opened text file, see from_lines()
+  @staticmethod
+  def load(file, rows_filter=None):
+    return StatsCluster.from_lines(file, rows_filter)
+
+  # Reads only the metadata of an opened text file: its first line or its
+  # leading === block. Entries are not read, unless the metadata is in the end of the file.
+  @staticmethod
+  def load_metadata(file):
+    lines = (line.rstrip('\r\n') for line in file if len(line.strip()) > 0)
+    first_line = next(lines, None)
+    if first_line is None:
+      raise ValueError('No metadata in given lines')
+    if first_line.strip().startswith('==='):
+      return StatsMetadata.from_str(__read_metadata_block(first_line, lines))
+    try:
+      return StatsMetadata.from_str(first_line)
+    except ValueError:
+      pass
+    for line in lines:
+      if line.strip().startswith('==='):
+        return StatsMetadata.from_str(__read_metadata_block(line, lines))
+    raise ValueError('No metadata in given lines, first line: {}'.format(first_line))
+
+  # Parses the cluster line by line, without keeping all of the lines in memory.
+  # Metadata is expected either in the first line, or in a === block
+  # in the beginning or in the end of the lines.
+  # With a StatsRowsFilter, rows which don't pass it are skipped before they're parsed.
+  @staticmethod
+  def from_lines(lines, rows_filter=None):
+    # Note that lines are not stripped here because indentation matters in YAML metadata
+    lines = (line.rstrip('\r\n') for line in lines if len(line.strip()) > 0)
+    first_line = next(lines, None)
+    if first_line is None:
+      raise ValueError('No metadata in given lines')
+
+    if first_line.strip().startswith('==='):
+      metadata = StatsMetadata.from_str(__read_metadata_block(first_line, lines))
+      return StatsCluster._from_columns(metadata, __lines_to_columns(metadata, lines, rows_filter))
+
+    try:
+      metadata = StatsMetadata.from_str(first_line)
+    except ValueError:
+      metadata = None
+    if metadata is not None:
+      return StatsCluster._from_columns(metadata, __lines_to_columns(metadata, lines, rows_filter))
+
+    # The first line is an entry, so the metadata must be in the end.
+    # Entries before it are kept until the metadata is read.
+    entries_lines = [first_line]
+    for line in lines:
+      if line.strip().startswith('==='):
+        metadata = StatsMetadata.from_str(__read_metadata_block(line, lines))
+        break
+      entries_lines.append(line)
+    if metadata is None:
+      raise ValueError('No metadata in given lines, first line: {}'.format(first_line))
+    columns = __lines_to_columns(metadata, chain(entries_lines, lines), rows_filter)
+    return StatsCluster._from_columns(metadata, columns)
+
   def __str__(self):
-    metadata_str = str(self._metadata)
-    entries_strs = []
-    for entry in self._stats_entries:
-      entries_strs.append(str(entry))
-    return '\n'.join([metadata_str] + entries_strs)
+    text_file = io.StringIO()
+    self.write_to(text_file)
+    return text_file.getvalue()
+
+  # Writes same text as str() into the text file, by chunks of rows,
+  # so that the whole text is never kept in memory
+  def write_to(self, file, rows_in_chunk=4096):
+    file.write(str(self._metadata))
+    for start in range(0, len(self._rows), rows_in_chunk):
+      lines = self._columns.rows_to_strs(self._rows[start:start+rows_in_chunk])
+      file.write('\n')
+      file.write('\n'.join(lines))
+
+  def __len__(self):
+    return len(self._rows)
 
   def type_at(self, indx):
-    return self._metadata.types()[indx]
+    return self._metadata.schema().type_at(indx)
 
   def typed_entries(self):
-    return list(self._typed_stats_entries)
+    return list(self.iter_typed_entries())
 
   def entries(self):
-    return list(self._stats_entries)
+    return list(self.iter_entries())
+
+  # Same as typed_entries() and entries(), but entries are created one by one
+  def iter_typed_entries(self):
+    return (self._columns.typed_entry_at(row) for row in self._rows)
+
+  def iter_entries(self):
+    return (self._columns.entry_at(row) for row in self._rows)
+
+  # Entry at the given index of the cluster, without building other entries
+  def typed_entry_at(self, indx):
+    return self._columns.typed_entry_at(self._rows[indx])
 
   def metadata(self):
     return self._metadata
 
-  def collapse(self):
-    entries_dict = {}
-    for entry in self._typed_stats_entries:
+  # Approximate memory used by the cluster, in bytes.
+  # Note that columns shared with other clusters (see slice()) are counted fully.
+  def estimated_size(self):
+    return self._columns.estimated_size() + sys.getsizeof(self._rows)
+
+  # Columns of the entries in the order of the cluster, shared with it when possible
+  def _to_columns(self):
+    if self._rows == range(len(self._columns)):
+      return self._columns
+    return self._columns.take(self._rows)
+
+  # Entries with dates between given dates (both inclusive), optionally only
+  # with given IDs. Any of the dates can be None for an open range.
+  # Because entries are sorted by date, they're found with a binary search.
+  # The result is a view: it shares entries with this cluster instead of copying them.
+  def slice(self, start_date, end_date, ids=None):
+    dates_given = start_date is not None or end_date is not None
+    if dates_given and self._metadata.schema().index_of(StatColumnType.DATE) is None:
+      raise ValueError('Cannot slice a cluster without dates by dates: {}'.format(self._metadata))
+    start = 0
+    end = len(self._rows)
+    if end_date is not None:
+      start = self.__first_row_index_before(DateCodec.date_to_day(end_date) + 1)
+    if start_date is not None:
+      end = max(start, self.__first_row_index_before(DateCodec.date_to_day(start_date)))
+    rows = self._rows[start:end]
+    if ids is not None:
+      rows = self._columns.rows_with_ids(rows, ids)
+    # A part of a collapsed cluster is collapsed, too
+    collapsed = True if self._collapsed else None
+    return StatsCluster.__view_of(self._metadata, self._columns, rows, collapsed)
+
+  # Sorted IDs of the entries
+  def ids(self):
+    ids_dictionary = self._columns.ids_dictionary()
+    return sorted(ids_dictionary.id_of(code) for code in self.__ids_index())
+
+  # Entries with the given ID, same as slice(None, None, [id_str]), but the
+  # rows of all IDs are found with one pass over the cluster, on first call.
+  # The result is a view, see slice().
+  def rows_for_id(self, id_str):
+    code = self._columns.ids_dictionary().find_code(id_str)
+    rows = self.__ids_index().get(code)
+    if rows is None:
+      rows = range(0)
+    collapsed = True if self._collapsed else None
+    return StatsCluster.__view_of(self._metadata, self._columns, rows, collapsed)
+
+  def __ids_index(self):
+    if self._ids_index is None:
+      self._ids_index = self._columns.rows_by_id_codes(self._rows)
+    return self._ids_index
+
+  # Index of the first row with a date earlier than the given day
+  def __first_row_index_before(self, day):
+    lo = 0
+    hi = len(self._rows)
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self._columns.day_at(self._rows[mid]) < day:
+        hi = mid
+      else:
+        lo = mid + 1
+    return lo
+
+  # Whether there're no entries with same date and ID.
+  # Clusters made by collapse() and merge() are known to be collapsed,
+  # others are verified once, on first call.
+  def is_collapsed(self):
+    if self._collapsed is None:
+      self._collapsed = self.__has_unique_date_id_pairs()
+    return self._collapsed
+
+  def __has_unique_date_id_pairs(self):
+    # Rows are sorted by date, so IDs need to be unique only within a day
+    current_day = None
+    day_ids = set()
+    for row in self._rows:
+      day, id_code = self._columns.key_at(row)
+      if day != current_day:
+        current_day = day
+        day_ids.clear()
+      elif id_code in day_ids:
+        return False
+      day_ids.add(id_code)
+    return True
+
+  # Sums VALUE columns of entries with same date and ID.
+  # COMMENT columns are either dropped, or taken from the first of the entries,
+  # or joined with spaces up to given length.
+  def collapse(self, comments_mode=CommentsMode.DROP, comments_join_limit=1000):
+    if not isinstance(comments_mode, StatsCluster.CommentsMode):
+      raise ValueError('Unknown comments mode: {}'.format(comments_mode))
+    columns = self._columns
+    comments_indexes = self._metadata.schema().indexes_of(StatColumnType.COMMENT)
+    # Result shares IDs dictionary with self, so that ID codes can be used as keys
+    result_columns = columns.empty_like()
+    result_rows = {}
+    for row in self._rows:
       # Note that currently we support only single date and single id
-      date_id_pair = (entry.date(), entry.id())
-      if date_id_pair not in entries_dict:
-        entries_dict[date_id_pair] = []
-      entries_dict[date_id_pair].append(entry)
-
-    result_typed_entries = []
-    for date_id_pair, same_date_id_entries in entries_dict.items():
-      # For simplicity, creating a list with same size as there are columns
-      sum_values = [0.] * len(self._metadata.types())
-      sum_comments = [''] * len(self._metadata.types())
-
-      # Summing
-      for entry in same_date_id_entries:
-        for indx, stat_column_type in enumerate(self._metadata.types()):
-          if stat_column_type is StatColumnType.VALUE:
-            sum_values[indx] += entry.at(indx)
-          elif stat_column_type is StatColumnType.COMMENT:
-            sum_comments += entry.at(indx) + ' '
-          elif stat_column_type is StatColumnType.ID or stat_column_type is StatColumnType.DATE:
-            pass # Pass, because we already constructed map with ID+DATE pairs
-          else:
-            raise ValueError('Unknown StatColumnType: {}'.format(stat_column_type))
-
-      # Constructing collapsed entry
-      result_columns = []
-      for indx, stat_column_type in enumerate(self._metadata.types()):
-        if stat_column_type is StatColumnType.VALUE:
-          result_columns.append('%g'%(sum_values[indx]))
-        elif stat_column_type is StatColumnType.COMMENT:
-          result_columns.append(sum_comments[indx])
-        elif stat_column_type is StatColumnType.ID or stat_column_type is StatColumnType.DATE:
-          result_columns.append(same_date_id_entries[0].not_typed.columns[indx])
-        else:
-          raise ValueError('Unknown StatColumnType: {}'.format(stat_column_type))
-      result_typed_entries.append(TypedStatsEntry(StatsEntry(result_columns), self._metadata.types()))
-
-    result_entries = []
-    for typed_entry in result_typed_entries:
-      result_entries.append(typed_entry.not_typed)
-    return StatsCluster(self._metadata, result_entries, result_typed_entries)
+      date_id_pair = columns.key_at(row)
+      result_row = result_rows.get(date_id_pair)
+      if result_row is None:
+        result_row = len(result_columns)
+        result_rows[date_id_pair] = result_row
+        result_columns.append_from(columns, row)
+        if comments_mode is StatsCluster.CommentsMode.DROP:
+          for indx in comments_indexes:
+            result_columns.set_at(indx, result_row, '')
+        continue
+      result_columns.add_values_from(columns, row, result_row)
+      if comments_mode is StatsCluster.CommentsMode.JOIN:
+        for indx in comments_indexes:
+          comment = result_columns.at(indx, result_row)
+          if len(comment) < comments_join_limit:
+            comment = ' '.join([comment, columns.at(indx, row)]) if len(comment) > 0 else columns.at(indx, row)
+            result_columns.set_at(indx, result_row, comment[:comments_join_limit])
+
+    # Rows were iterated in sorted order, so result rows are sorted too
+    return StatsCluster.__view_of(self._metadata, result_columns, range(len(result_columns)),
+                                  collapsed=True)
 
   # Self an passed Cluster both must be collapsed
   def merge(self, other, prioritized):
     # Verifying collapsed state
-    if len(self._stats_entries) != len(self.collapse()._stats_entries):
-      raise ValueError('Self is not collapsed: {}'.format(self._stats_entries))
-    if len(other._stats_entries) != len(other.collapse()._stats_entries):
-      raise ValueError('Other cluster is not collapsed: {}'.format(other.stats_entries))
+    if not self.is_collapsed():
+      raise ValueError('Self is not collapsed: {}'.format(self))
+    if not other.is_collapsed():
+      raise ValueError('Other cluster is not collapsed: {}'.format(other))
     if self._metadata != other._metadata:
       raise ValueError('Metadata of both clusters must be same, but it isn\'t: {}, {}'.format(self._metadata, other._metadata))
 
@@ -143,28 +337,102 @@ class StatsCluster:
     else:
       raise ValueError('One of the given clusters must be prioritized')
 
-    # Filling merged entries dict with prioritized entries
-    merged_entries_dict = {}
-    for entry in prioritized.typed_entries():
-      date_id_pair = (entry.date(), entry.id())
-      # Note that we asserted in the beginning of the function
-      # that both clusters are already collapsed.
-      if date_id_pair in merged_entries_dict:
-        raise RuntimeError('Unexpectedly collapsing didn\'t work: {}', prioritized)
-      merged_entries_dict[date_id_pair] = entry
-
-    # Filling merged entries dict with not prioritized entries
-    for entry in notprioritized.typed_entries():
-      date_id_pair = (entry.date(), entry.id())
-      if date_id_pair not in merged_entries_dict:
-        merged_entries_dict[date_id_pair] = entry
-
-    typed_entries = []
-    for entry in merged_entries_dict.values():
-      typed_entries.append(entry)
-
-    merged_entries = []
-    for entry in typed_entries:
-      merged_entries.append(entry.not_typed)
-
-    return StatsCluster(self._metadata, merged_entries, typed_entries)
\ No newline at end of file
+    return StatsCluster.__merge_sorted([prioritized, notprioritized])
+
+  # Merges several collapsed clusters, for each pair of date and ID the entry
+  # of the first cluster which has it is taken.
+  @staticmethod
+  def merge_many(clusters_in_priority_order):
+    clusters = list(clusters_in_priority_order)
+    if len(clusters) == 0:
+      raise ValueError('No clusters to merge')
+    for cluster in clusters:
+      if not cluster.is_collapsed():
+        raise ValueError('Cluster is not collapsed: {}'.format(cluster))
+      if cluster._metadata != clusters[0]._metadata:
+        raise ValueError('Metadata of all clusters must be same, but it isn\'t: {}, {}'.format(
+          clusters[0]._metadata, cluster._metadata))
+    if len(clusters) == 1:
+      return clusters[0]
+    return StatsCluster.__merge_sorted(clusters)
+
+  # Joins clusters with same metadata into one, the clusters must be in
+  # order of their dates: all dates of a cluster are earlier than dates of previous clusters.
+  # Unlike merge_many(), entries are not compared, they're just copied.
+  @staticmethod
+  def concat(clusters_in_dates_order):
+    clusters = list(clusters_in_dates_order)
+    if len(clusters) == 0:
+      raise ValueError('No clusters to concat')
+    date_indx = clusters[0]._metadata.schema().index_of(StatColumnType.DATE)
+    earliest_day = None
+    for cluster in clusters:
+      if cluster._metadata != clusters[0]._metadata:
+        raise ValueError('Metadata of all clusters must be same, but it isn\'t: {}, {}'.format(
+          clusters[0]._metadata, cluster._metadata))
+      if len(cluster._rows) == 0:
+        continue
+      if earliest_day is not None and (date_indx is None or cluster._columns.day_at(cluster._rows[0]) >= earliest_day):
+        raise ValueError('Clusters are not in order of their dates: {}'.format(cluster))
+      earliest_day = cluster._columns.day_at(cluster._rows[-1])
+    if len(clusters) == 1:
+      return clusters[0]
+    picks = [(indx, row) for indx, cluster in enumerate(clusters) for row in cluster._rows]
+    columns = StatsColumns.gather([cluster._columns for cluster in clusters], picks)
+    collapsed = True if all(cluster._collapsed for cluster in clusters) else None
+    return StatsCluster.__view_of(clusters[0]._metadata, columns, range(len(columns)), collapsed)
+
+  # K-way merge of collapsed clusters with same metadata. Clusters are sorted
+  # by date, so they're walked day by day, and within a day rows are taken in
+  # order of the clusters priority, skipping IDs which are already taken.
+  # The result is sorted already, nothing is sorted again.
+  @staticmethod
+  def __merge_sorted(clusters):
+    schema = clusters[0]._metadata.schema()
+    date_indx = schema.index_of(StatColumnType.DATE)
+    id_indx = schema.index_of(StatColumnType.ID)
+    ids_dictionary = clusters[0]._columns.ids_dictionary()
+    # With a shared IDs dictionary, ID codes can be compared instead of IDs
+    shared_ids = all(cluster._columns.ids_dictionary() is ids_dictionary for cluster in clusters)
+    sources = [cluster._columns for cluster in clusters]
+    # Clusters without dates are considered to have all rows in same day
+    no_days = [0] * max(len(columns) for columns in sources)
+    days = [columns.raw_column_at(date_indx) if date_indx is not None else no_days for columns in sources]
+    ids = [columns.raw_column_at(id_indx) if id_indx is not None else no_days for columns in sources]
+
+    # Heap of (negated day, priority, position in rows), so that the most
+    # recent day goes first, and within a day the most prioritized cluster
+    heap = []
+    for priority, cluster in enumerate(clusters):
+      if len(cluster._rows) > 0:
+        heap.append((-days[priority][cluster._rows[0]], priority, 0))
+    heapq.heapify(heap)
+
+    picks = []
+    day_ids = set()
+    current_day = None
+    while len(heap) > 0:
+      negated_day, priority, position = heapq.heappop(heap)
+      if negated_day != current_day:
+        current_day = negated_day
+        day_ids.clear()
+      rows = clusters[priority]._rows
+      source_days = days[priority]
+      source_ids = ids[priority]
+      day = -negated_day
+      while position < len(rows):
+        row = rows[position]
+        if source_days[row] != day:
+          heapq.heappush(heap, (-source_days[row], priority, position))
+          break
+        id_key = source_ids[row]
+        if not shared_ids and id_indx is not None:
+          id_key = sources[priority].ids_dictionary().id_of(id_key)
+        if id_key not in day_ids:
+          day_ids.add(id_key)
+          picks.append((priority, row))
+        position += 1
+
+    merged_columns = StatsColumns.gather(sources, picks)
+    return StatsCluster.__view_of(clusters[0]._metadata, merged_columns, range(len(merged_columns)),
+                                  collapsed=True)
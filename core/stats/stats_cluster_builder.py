@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from core.stats.stats_columns import StatsColumns
+from core.stats.stats_cluster import StatsCluster
+from core.stats.stat_column_type import StatColumnType
+from core.stats.date_codec import DateCodec
+
+# Same checks as TypedStatsEntry.from_stats() does
+def _StatsClusterBuilder__validate_column(stat_column_type, typed_column):
+  if stat_column_type is StatColumnType.DATE:
+    if not isinstance(typed_column, datetime):
+      raise ValueError('Value {} was expected to be a datetime'.format(typed_column))
+  elif stat_column_type is StatColumnType.ID or stat_column_type is StatColumnType.COMMENT:
+    if not isinstance(typed_column, str):
+      raise ValueError('Value {} was expected to be a str'.format(typed_column))
+  elif stat_column_type is StatColumnType.VALUE:
+    if not isinstance(typed_column, float) and not isinstance(typed_column, int):
+      raise ValueError('Value {} was expected to be a float or int'.format(typed_column))
+  else:
+    raise ValueError('Unexpected type {} for column {}'.format(stat_column_type, typed_column))
+
+# Builds a collapsed cluster from entries added one by one.
+# VALUE columns of entries with same date and ID are summed right away
+# (same as StatsCluster.collapse()), so the memory depends on the number of
+# different (date, ID) pairs rather than on the number of added entries,
+# and no TypedStatsEntry objects are created.
+class StatsClusterBuilder:
+  def __init__(self, metadata, comments_mode=StatsCluster.CommentsMode.DROP, comments_join_limit=1000):
+    if not isinstance(comments_mode, StatsCluster.CommentsMode):
+      raise ValueError('Unknown comments mode: {}'.format(comments_mode))
+    self._metadata = metadata
+    schema = metadata.schema()
+    self._types = schema.types_view()
+    # Note that currently we support only single date and single id
+    self._date_indx = schema.index_of(StatColumnType.DATE)
+    self._id_indx = schema.index_of(StatColumnType.ID)
+    self._values_indexes = schema.indexes_of(StatColumnType.VALUE)
+    self._comments_indexes = schema.indexes_of(StatColumnType.COMMENT)
+    self._comments_mode = comments_mode
+    self._comments_join_limit = comments_join_limit
+    self._columns = StatsColumns(schema)
+    # (day ordinal, ID) pairs to their rows in self._columns
+    self._rows = {}
+
+  def __len__(self):
+    return len(self._columns)
+
+  # Adds an entry of typed columns in order of the metadata types:
+  # datetimes for DATE columns (only days are kept), numbers for VALUE,
+  # strings for ID and COMMENT.
+  def add(self, typed_columns):
+    if len(typed_columns) != len(self._types):
+      raise ValueError('Columns {} don\'t match types {}'.format(typed_columns, self._types))
+    for stat_column_type, typed_column in zip(self._types, typed_columns):
+      __validate_column(stat_column_type, typed_column)
+    day = None
+    if self._date_indx is not None:
+      day = DateCodec.date_to_day(typed_columns[self._date_indx])
+    id_str = typed_columns[self._id_indx] if self._id_indx is not None else None
+    key = (day, id_str)
+    row = self._rows.get(key)
+    if row is None:
+      self._rows[key] = len(self._columns)
+      self._columns.append_row(self.__row_of(typed_columns, day))
+      return
+
+    for indx in self._values_indexes:
+      self._columns.set_at(indx, row, self._columns.at(indx, row) + typed_columns[indx])
+    if self._comments_mode is StatsCluster.CommentsMode.JOIN:
+      for indx in self._comments_indexes:
+        comment = self._columns.at(indx, row)
+        if len(comment) < self._comments_join_limit:
+          comment = ' '.join([comment, typed_columns[indx]]) if len(comment) > 0 else typed_columns[indx]
+          self._columns.set_at(indx, row, comment[:self._comments_join_limit])
+
+  def __row_of(self, typed_columns, day):
+    row = list(typed_columns)
+    if self._date_indx is not None:
+      row[self._date_indx] = day
+    for indx in self._values_indexes:
+      row[indx] = float(row[indx])
+    for indx in self._comments_indexes:
+      if self._comments_mode is StatsCluster.CommentsMode.DROP:
+        row[indx] = ''
+      elif self._comments_mode is StatsCluster.CommentsMode.JOIN:
+        row[indx] = row[indx][:self._comments_join_limit]
+    return row
+
+  # Collapsed cluster of the added entries, sorted by date.
+  # The builder must not be used after that.
+  def build(self):
+    return StatsCluster._from_columns(self._metadata, self._columns, collapsed=True)
@@ -0,0 +1,73 @@
+import unittest
+
+from datetime import datetime
+
+from core.stats.stats_cluster_builder import StatsClusterBuilder
+from core.stats.stats_entry import StatsEntry
+from core.stats.stats_metadata import StatsMetadata
+from core.stats.stats_cluster import StatsCluster
+
+# Whether adding the columns after a valid entry throws ValueError,
+# the valid entry must stay as is
+def _StatsClusterBuilderTests__add_throws(typed_columns):
+  builder = StatsClusterBuilder(StatsMetadata.from_str('date;value;id;comment'))
+  builder.add([datetime(2019, 4, 6), 1, 'a', ''])
+  exception_caught = False
+  try:
+    builder.add(typed_columns)
+  except ValueError:
+    exception_caught = True
+  if builder.build().entries() != [StatsEntry.from_str('06/04/2019;1;a;')]:
+    return False
+  return exception_caught
+
+class StatsClusterBuilderTests(unittest.TestCase):
+  def test_values_of_same_date_and_id_are_summed(self):
+    builder = StatsClusterBuilder(StatsMetadata.from_str('date;value;value;id'))
+    builder.add([datetime(2019, 4, 6, 10, 30), 1, 2, 'hello'])
+    builder.add([datetime(2019, 4, 7), 1, 2, 'hello'])
+    builder.add([datetime(2019, 4, 6, 23, 59), 1.5, 3, 'hello'])
+    builder.add([datetime(2019, 4, 6), 1, 1, 'world'])
+    self.assertEqual(3, len(builder))
+
+    stats_cluster = builder.build()
+    self.assertTrue(stats_cluster.is_collapsed())
+    self.assertEqual([StatsEntry.from_str('07/04/2019;1;2;hello'),
+                      StatsEntry.from_str('06/04/2019;2.5;5;hello'),
+                      StatsEntry.from_str('06/04/2019;1;1;world')], stats_cluster.entries())
+
+  def test_built_cluster_is_same_as_collapsed(self):
+    metadata = StatsMetadata.from_str('date;value;id;comment')
+    entries = [StatsEntry.from_str('06/04/2019;1;hello;first'),
+               StatsEntry.from_str('07/04/2019;2;world;second'),
+               StatsEntry.from_str('06/04/2019;3;hello;third')]
+    for comments_mode in StatsCluster.CommentsMode:
+      builder = StatsClusterBuilder(metadata, comments_mode)
+      for typed_entry in StatsCluster(metadata, entries).typed_entries():
+        builder.add([typed_entry.at(indx) for indx in range(len(metadata.types()))])
+      self.assertEqual(StatsCluster(metadata, entries).collapse(comments_mode).entries(),
+                       builder.build().entries())
+
+  def test_throws_when_columns_dont_match_types(self):
+    builder = StatsClusterBuilder(StatsMetadata.from_str('date;value;id'))
+    exception_caught = False
+    try:
+      builder.add([datetime(2019, 4, 6), 1])
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_throws_when_date_is_not_datetime(self):
+    for date in [None, '06/04/2019']:
+      self.assertTrue(__add_throws([date, 1, 'a', '']), date)
+
+  def test_throws_when_value_is_not_number(self):
+    for value in [None, '1']:
+      self.assertTrue(__add_throws([datetime(2019, 4, 6), value, 'a', '']), value)
+
+  def test_throws_when_id_is_not_str(self):
+    for id_column in [None, 1]:
+      self.assertTrue(__add_throws([datetime(2019, 4, 6), 1, id_column, '']), id_column)
+
+  def test_throws_when_comment_is_not_str(self):
+    self.assertTrue(__add_throws([datetime(2019, 4, 6), 1, 'a', None]))
@@ -1,5 +1,6 @@
 import unittest
 import math
+import io
 
 from datetime import datetime
 
@@ -257,3 +258,200 @@ class StatsClusterTests(unittest.TestCase):
     except:
         exception_caught2 = True
     self.assertTrue(exception_caught2)
+
+  def test_can_load_from_lines(self):
+    lines = iter(['date;value;id\n', '\n', '  06/04/2019;1;hello  \n', '07/04/2019;2;world\n'])
+    cluster = StatsCluster.from_lines(lines)
+    self.assertEqual(StatsMetadata.from_str('date;value;id'), cluster.metadata())
+    self.assertEqual([StatsEntry.from_str('07/04/2019;2;world'), StatsEntry.from_str('06/04/2019;1;hello')],
+                     cluster.entries())
+
+  def test_can_load_from_file_object_with_metadata_in_the_end(self):
+    cluster_file = io.StringIO('06/04/2019;1;hello\n07/04/2019;2;world\n===\n- what: format\n  value: date;value;id\n===\n')
+    cluster = StatsCluster.load(cluster_file)
+    self.assertEqual([StatColumnType.DATE, StatColumnType.VALUE, StatColumnType.ID], cluster.metadata().types())
+    self.assertEqual(2, len(cluster.entries()))
+    self.assertEqual(StatsEntry.from_str('07/04/2019;2;world'), cluster.entries()[0])
+
+  def test_loading_throws_when_no_metadata(self):
+    for lines in [[], ['06/04/2019;1;hello'], ['===', '- what: format', '  value: date;value;id']]:
+      exception_caught = False
+      try:
+        StatsCluster.from_lines(lines)
+      except ValueError:
+        exception_caught = True
+      self.assertTrue(exception_caught, lines)
+
+  def test_can_load_only_metadata(self):
+    metadata = StatsMetadata.from_str('date;value;id')
+    for text in ['date;value;id\n06/04/2019;1;hello',
+                 '\n===\n- what: format\n  value: date;value;id\n===\n06/04/2019;1;hello',
+                 '06/04/2019;1;hello\n===\n- what: format\n  value: date;value;id\n===\n']:
+      self.assertEqual(metadata.types(), StatsCluster.load_metadata(io.StringIO(text)).types())
+    # Entries after the metadata line are not read
+    lines = iter(['date;value;id\n', 'not an entry\n'])
+    self.assertEqual(metadata, StatsCluster.load_metadata(lines))
+    self.assertEqual('not an entry\n', next(lines))
+
+  def test_can_slice_by_dates(self):
+    cluster = StatsCluster.from_str('date;value;id\n'
+                                    + '05/04/2019;1;a\n06/04/2019;2;b\n07/04/2019;3;a\n07/04/2019;4;b\n09/04/2019;5;a')
+
+    sliced = cluster.slice(datetime(2019, 4, 6), datetime(2019, 4, 7, 12, 0))
+    self.assertEqual([StatsEntry.from_str('07/04/2019;3;a'),
+                      StatsEntry.from_str('07/04/2019;4;b'),
+                      StatsEntry.from_str('06/04/2019;2;b')], sliced.entries())
+    self.assertEqual(3, len(sliced))
+    self.assertEqual(5, len(cluster.slice(None, None)))
+    self.assertEqual(1, len(cluster.slice(datetime(2019, 4, 8), None)))
+    self.assertEqual(2, len(cluster.slice(None, datetime(2019, 4, 6))))
+    self.assertEqual(0, len(cluster.slice(datetime(2019, 4, 8), datetime(2019, 4, 8))))
+    self.assertEqual(0, len(cluster.slice(datetime(2019, 4, 8), datetime(2019, 4, 6))))
+
+  def test_can_slice_by_ids(self):
+    cluster = StatsCluster.from_str('date;value;id\n'
+                                    + '05/04/2019;1;a\n06/04/2019;2;b\n07/04/2019;3;a\n07/04/2019;4;b\n09/04/2019;5;c')
+
+    sliced = cluster.slice(None, datetime(2019, 4, 7), ids={'b', 'c', 'unknown'})
+    self.assertEqual([StatsEntry.from_str('07/04/2019;4;b'), StatsEntry.from_str('06/04/2019;2;b')],
+                     sliced.entries())
+    sliced = sliced.slice(datetime(2019, 4, 7), None)
+    self.assertEqual([StatsEntry.from_str('07/04/2019;4;b')], sliced.entries())
+    self.assertEqual('date;value;id\n07/04/2019;4;b', str(sliced))
+
+  def test_slices_can_be_collapsed_and_merged(self):
+    cluster = StatsCluster.from_str('date;value;id\n05/04/2019;1;a\n06/04/2019;2;b\n06/04/2019;3;b')
+    sliced = cluster.slice(datetime(2019, 4, 6), None).collapse()
+    self.assertEqual([StatsEntry.from_str('06/04/2019;5;b')], sliced.entries())
+
+    other = StatsCluster.from_str('date;value;id\n06/04/2019;1;b\n07/04/2019;1;b')
+    merged = sliced.merge(other, prioritized=sliced)
+    self.assertEqual([StatsEntry.from_str('07/04/2019;1;b'), StatsEntry.from_str('06/04/2019;5;b')],
+                     merged.entries())
+
+  def test_collapsed_fractional_values_are_written_without_noise(self):
+    cluster = StatsCluster.from_str('date;value;value;id\n06/04/2019;0.1;1;a\n06/04/2019;0.2;1;a\n07/04/2019;1.25;1;a')
+    self.assertEqual('date;value;value;id\n07/04/2019;1.25;1;a\n06/04/2019;0.3;2;a', str(cluster.collapse()))
+
+  def test_collapsing_drops_comments_by_default(self):
+    cluster = StatsCluster.from_str('date;value;id;comment\n06/04/2019;1;a;first\n06/04/2019;2;a;second')
+    self.assertEqual([StatsEntry.from_str('06/04/2019;3;a;')], cluster.collapse().entries())
+
+  def test_collapsing_can_keep_first_comment(self):
+    cluster = StatsCluster.from_str('date;value;id;comment\n06/04/2019;1;a;first\n06/04/2019;2;a;second')
+    collapsed = cluster.collapse(comments_mode=StatsCluster.CommentsMode.FIRST)
+    self.assertEqual([StatsEntry.from_str('06/04/2019;3;a;first')], collapsed.entries())
+
+  def test_collapsing_can_join_comments(self):
+    cluster = StatsCluster.from_str('date;value;id;comment\n'
+                                    + '06/04/2019;1;a;first\n06/04/2019;2;a;second\n'
+                                    + '06/04/2019;3;a;third\n07/04/2019;1;a;other')
+    collapsed = cluster.collapse(comments_mode=StatsCluster.CommentsMode.JOIN)
+    self.assertEqual([StatsEntry.from_str('07/04/2019;1;a;other'),
+                      StatsEntry.from_str('06/04/2019;6;a;first second third')], collapsed.entries())
+
+    collapsed = cluster.collapse(comments_mode=StatsCluster.CommentsMode.JOIN, comments_join_limit=8)
+    self.assertEqual(StatsEntry.from_str('06/04/2019;6;a;first se'), collapsed.entries()[1])
+
+  def test_knows_whether_collapsed(self):
+    metadata = StatsMetadata([StatColumnType.DATE, StatColumnType.VALUE, StatColumnType.ID])
+    collapsed = StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;a'),
+                                        StatsEntry.from_str('06/04/2019;1;b'),
+                                        StatsEntry.from_str('07/04/2019;1;a')])
+    not_collapsed = StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;a'),
+                                            StatsEntry.from_str('07/04/2019;1;a'),
+                                            StatsEntry.from_str('06/04/2019;1;a')])
+    self.assertTrue(collapsed.is_collapsed())
+    self.assertFalse(not_collapsed.is_collapsed())
+    self.assertTrue(not_collapsed.collapse().is_collapsed())
+    self.assertTrue(not_collapsed.slice(datetime(2019, 4, 7), None).is_collapsed())
+    self.assertTrue(collapsed.merge(not_collapsed.collapse(), prioritized=collapsed).is_collapsed())
+
+  def test_iterated_entries_are_same_as_copied(self):
+    cluster = StatsCluster.from_str('date;value;id\n06/04/2019;1;hello\n07/04/2019;2;world')
+    self.assertEqual(cluster.entries(), list(cluster.iter_entries()))
+    self.assertEqual([entry.not_typed for entry in cluster.typed_entries()],
+                     [entry.not_typed for entry in cluster.iter_typed_entries()])
+
+  def test_merged_entries_are_sorted_and_prioritized_first_within_day(self):
+    cluster1 = StatsCluster.from_str('date;value;id\n07/04/2019;1;b\n06/04/2019;1;a')
+    cluster2 = StatsCluster.from_str('date;value;id\n08/04/2019;2;a\n07/04/2019;2;a\n07/04/2019;2;b')
+    merged_cluster = cluster1.merge(cluster2, prioritized=cluster1)
+    self.assertEqual([StatsEntry.from_str('08/04/2019;2;a'),
+                      StatsEntry.from_str('07/04/2019;1;b'),
+                      StatsEntry.from_str('07/04/2019;2;a'),
+                      StatsEntry.from_str('06/04/2019;1;a')], merged_cluster.entries())
+
+  def test_can_merge_many_clusters(self):
+    cluster1 = StatsCluster.from_str('date;value;id\n07/04/2019;1;a')
+    cluster2 = StatsCluster.from_str('date;value;id\n07/04/2019;2;a\n07/04/2019;2;b')
+    cluster3 = StatsCluster.from_str('date;value;id\n07/04/2019;3;b\n07/04/2019;3;c\n05/04/2019;3;a')
+    merged_cluster = StatsCluster.merge_many([cluster1, cluster2, cluster3])
+    self.assertEqual([StatsEntry.from_str('07/04/2019;1;a'),
+                      StatsEntry.from_str('07/04/2019;2;b'),
+                      StatsEntry.from_str('07/04/2019;3;c'),
+                      StatsEntry.from_str('05/04/2019;3;a')], merged_cluster.entries())
+    self.assertTrue(merged_cluster.is_collapsed())
+
+  def test_merge_many_throws_when_not_collapsed(self):
+    cluster1 = StatsCluster.from_str('date;value;id\n07/04/2019;1;a')
+    cluster2 = StatsCluster.from_str('date;value;id\n07/04/2019;2;a\n07/04/2019;2;a')
+    exception_caught = False
+    try:
+      StatsCluster.merge_many([cluster1, cluster2])
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_can_merge_clusters_without_dates(self):
+    cluster1 = StatsCluster.from_str('value;id\n1;a')
+    cluster2 = StatsCluster.from_str('value;id\n2;a\n2;b')
+    merged_cluster = StatsCluster.merge_many([cluster1, cluster2])
+    self.assertEqual([StatsEntry.from_str('1;a'), StatsEntry.from_str('2;b')], merged_cluster.entries())
+
+  def test_written_text_is_same_as_str(self):
+    cluster = StatsCluster.from_str('===\n- what: format\n  value: date;value;id\n===\n' +
+                                    '06/04/2019;1;hello\n07/04/2019;2;world\n08/04/2019;3;bye')
+    for rows_in_chunk in [1, 2, 100]:
+      text_file = io.StringIO()
+      cluster.write_to(text_file, rows_in_chunk)
+      self.assertEqual(str(cluster), text_file.getvalue())
+
+    text_file = io.StringIO()
+    StatsCluster.from_str('date;value;id').write_to(text_file)
+    self.assertEqual('date;value;id', text_file.getvalue())
+
+  def test_ids_and_rows_for_id(self):
+    cluster = StatsCluster.from_str('date;value;id\n05/04/2019;1;b\n06/04/2019;2;a\n07/04/2019;3;b')
+    self.assertEqual(['a', 'b'], cluster.ids())
+    self.assertEqual([StatsEntry.from_str('07/04/2019;3;b'), StatsEntry.from_str('05/04/2019;1;b')],
+                     cluster.rows_for_id('b').entries())
+    self.assertEqual([StatsEntry.from_str('06/04/2019;2;a')], cluster.rows_for_id('a').entries())
+    self.assertEqual([], cluster.rows_for_id('c').entries())
+
+    sliced = cluster.slice(datetime(2019, 4, 6), None)
+    self.assertEqual(['a', 'b'], sliced.ids())
+    self.assertEqual([StatsEntry.from_str('07/04/2019;3;b')], sliced.rows_for_id('b').entries())
+    self.assertEqual(['b'], cluster.slice(None, None, ['b']).ids())
+
+  def test_ids_of_cluster_without_ids(self):
+    cluster = StatsCluster.from_str('date;value\n05/04/2019;1')
+    exception_caught = False
+    try:
+      cluster.ids()
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_concat(self):
+    first = StatsCluster.from_str('date;value;id\n06/04/2019;1;a\n07/04/2019;2;b')
+    second = StatsCluster.from_str('date;value;id\n05/04/2019;3;c')
+    concatenated = StatsCluster.concat([first, StatsCluster.from_str('date;value;id'), second])
+    self.assertEqual(first.entries() + second.entries(), concatenated.entries())
+
+    exception_caught = False
+    try:
+      StatsCluster.concat([second, first])
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
@@ -0,0 +1,363 @@
+import operator
+import sys
+
+from array import array
+from itertools import islice
+
+from core.stats.stats_entry import StatsEntry
+from core.stats.typed_stats_entry import TypedStatsEntry
+from core.stats.typed_stats_entry import format_value
+from core.stats.stat_column_type import StatColumnType
+from core.stats.stats_schema import StatsSchema
+from core.stats.date_codec import DateCodec
+
+# Maps IDs to int codes and back. Codes are only ever added, so a dictionary
+# can be safely shared by several StatsColumns.
+class _IdsDictionary:
+  def __init__(self):
+    self._ids = []
+    self._codes = {}
+
+  def code_of(self, id_str):
+    code = self._codes.get(id_str)
+    if code is None:
+      code = len(self._ids)
+      self._ids.append(id_str)
+      self._codes[id_str] = code
+    return code
+
+  def id_of(self, code):
+    return self._ids[code]
+
+  # None if the ID was never added
+  def find_code(self, id_str):
+    return self._codes.get(id_str)
+
+  def __len__(self):
+    return len(self._ids)
+
+  # IDs in order of their codes
+  def ids(self):
+    return list(self._ids)
+
+  # Approximate memory used by the dictionary, in bytes
+  def estimated_size(self):
+    ids_size = sum(sys.getsizeof(id_str) for id_str in self._ids)
+    return ids_size + sys.getsizeof(self._ids) + sys.getsizeof(self._codes)
+
+  # New dictionary with same codes, which can be extended without changing this one
+  def copy(self):
+    ids_dictionary = _IdsDictionary()
+    ids_dictionary._ids = list(self._ids)
+    ids_dictionary._codes = dict(self._codes)
+    return ids_dictionary
+
+  @staticmethod
+  def from_ids(ids):
+    ids_dictionary = _IdsDictionary()
+    for id_str in ids:
+      ids_dictionary.code_of(id_str)
+    return ids_dictionary
+
+# Strings of the column at given rows, each distinct value is converted once
+def _StatsColumns__strs_of(column, rows, to_str):
+  strs_by_values = {}
+  strs = []
+  for row in rows:
+    value = column[row]
+    value_str = strs_by_values.get(value)
+    if value_str is None:
+      value_str = to_str(value)
+      strs_by_values[value] = value_str
+    strs.append(value_str)
+  return strs
+
+# Column-oriented storage of stats entries.
+# Instead of keeping a list of strings per entry, each column is kept
+# in its own compact array: DATE columns as int day ordinals, VALUE columns
+# as floats and ID columns as int codes of a shared dictionary.
+# Row objects (StatsEntry, TypedStatsEntry) are built only when asked for.
+class StatsColumns:
+  # Types are either a list of StatColumnType or an already compiled StatsSchema
+  def __init__(self, types, ids_dictionary=None):
+    if ids_dictionary is None:
+      ids_dictionary = _IdsDictionary()
+    self._schema = StatsSchema.of(types)
+    self._types = self._schema.types_view()
+    self._ids = ids_dictionary
+    self._size = 0
+    # Note that currently we support only single date and single id,
+    # index_of() throws if there're several columns of the type.
+    self._date_indx = self._schema.index_of(StatColumnType.DATE)
+    self._id_indx = self._schema.index_of(StatColumnType.ID)
+    self._columns = []
+    for stat_column_type in self._types:
+      if stat_column_type is StatColumnType.DATE:
+        self._columns.append(array('i'))
+      elif stat_column_type is StatColumnType.VALUE:
+        self._columns.append(array('d'))
+      elif stat_column_type is StatColumnType.ID:
+        self._columns.append(array('i'))
+      elif stat_column_type is StatColumnType.COMMENT:
+        self._columns.append([])
+      else:
+        raise ValueError('Unknown StatColumnType: {}'.format(stat_column_type))
+
+  def __len__(self):
+    return self._size
+
+  def types(self):
+    return list(self._types)
+
+  def schema(self):
+    return self._schema
+
+  def ids_dictionary(self):
+    return self._ids
+
+  # Approximate memory used by the columns and their IDs dictionary, in bytes
+  def estimated_size(self):
+    size = self._ids.estimated_size()
+    for column in self._columns:
+      size += sys.getsizeof(column)
+      if not isinstance(column, array):
+        size += sum(sys.getsizeof(comment) for comment in column)
+    return size
+
+  # The storage of the column: an array for DATE, VALUE and ID columns, a list for COMMENT.
+  # ID columns have codes of ids_dictionary().
+  def raw_column_at(self, indx):
+    return self._columns[indx]
+
+  # Columns made of already filled storages, see raw_column_at()
+  @staticmethod
+  def _from_raw_columns(schema, ids_dictionary, raw_columns, size):
+    columns = StatsColumns(schema, ids_dictionary)
+    if len(raw_columns) != len(columns._columns):
+      raise ValueError('Columns don\'t match types {}'.format(columns._types))
+    for indx, raw_column in enumerate(raw_columns):
+      if len(raw_column) != size or type(raw_column) != type(columns._columns[indx]):
+        raise ValueError('Column {} doesn\'t match type {}'.format(indx, columns._types[indx]))
+      columns._columns[indx] = raw_column
+    columns._size = size
+    return columns
+
+  def append_entry(self, stats_entry):
+    self.append_strs(stats_entry.columns)
+
+  # Appends not typed columns of an entry
+  def append_strs(self, columns):
+    if len(columns) != len(self._types):
+      raise ValueError('Entry {} doesn\'t match types {}'.format(';'.join(columns), self._types))
+    for indx, stat_column_type in enumerate(self._types):
+      column = columns[indx]
+      if stat_column_type is StatColumnType.DATE:
+        self._columns[indx].append(DateCodec.str_to_day(column))
+      elif stat_column_type is StatColumnType.VALUE:
+        self._columns[indx].append(float(column))
+      elif stat_column_type is StatColumnType.ID:
+        self._columns[indx].append(self._ids.code_of(column))
+      else:
+        self._columns[indx].append(column)
+    self._size += 1
+
+  # Appends a TypedStatsEntry, reusing its already parsed columns
+  def append_typed_entry(self, typed_entry):
+    if len(typed_entry.not_typed.columns) != len(self._types):
+      raise ValueError('Entry {} doesn\'t match types {}'.format(typed_entry, self._types))
+    for indx, stat_column_type in enumerate(self._types):
+      if stat_column_type is StatColumnType.DATE:
+        self._columns[indx].append(DateCodec.date_to_day(typed_entry.at(indx)))
+      elif stat_column_type is StatColumnType.ID:
+        self._columns[indx].append(self._ids.code_of(typed_entry.at(indx)))
+      else:
+        self._columns[indx].append(typed_entry.at(indx))
+    self._size += 1
+
+  # Appends a row of already typed columns. Note that DATE columns
+  # are expected to be day ordinals, not datetimes.
+  def append_row(self, row):
+    if len(row) != len(self._types):
+      raise ValueError('Row {} doesn\'t match types {}'.format(row, self._types))
+    for indx, stat_column_type in enumerate(self._types):
+      if stat_column_type is StatColumnType.ID:
+        self._columns[indx].append(self._ids.code_of(row[indx]))
+      else:
+        self._columns[indx].append(row[indx])
+    self._size += 1
+
+  # Empty columns of same types, sharing the IDs dictionary,
+  # so that ID codes of both columns are equal.
+  def empty_like(self):
+    return StatsColumns(self._schema, self._ids)
+
+  # Appends a row of another StatsColumns with same types.
+  def append_from(self, other, row):
+    for indx, stat_column_type in enumerate(self._types):
+      if stat_column_type is StatColumnType.ID and other._ids is not self._ids:
+        self._columns[indx].append(self._ids.code_of(other.id_at(row)))
+      else:
+        self._columns[indx].append(other._columns[indx][row])
+    self._size += 1
+
+  # New columns made of rows of several columns with same types. Picks are pairs of
+  # an index of the source columns and a row of them.
+  # The IDs dictionary of the first source is copied rather than shared, because IDs of
+  # other sources are added to it, and sources can be shared by threads (see ClustersCache).
+  @staticmethod
+  def gather(sources, picks):
+    ids_dictionary = sources[0]._ids
+    result = StatsColumns(sources[0]._schema, ids_dictionary.copy())
+    for indx, stat_column_type in enumerate(result._types):
+      source_columns = [source._columns[indx] for source in sources]
+      if stat_column_type is StatColumnType.ID:
+        values = []
+        for source, row in picks:
+          code = source_columns[source][row]
+          # Codes of the first source's dictionary are same in its copy
+          if sources[source]._ids is not ids_dictionary:
+            code = result._ids.code_of(sources[source]._ids.id_of(code))
+          values.append(code)
+      else:
+        values = [source_columns[source][row] for source, row in picks]
+      if isinstance(result._columns[indx], array):
+        values = array(result._columns[indx].typecode, values)
+      result._columns[indx] = values
+    result._size = len(picks)
+    return result
+
+  # Adds VALUE columns of a row of other columns to VALUE columns of given row
+  def add_values_from(self, other, other_row, row):
+    for indx in self._schema.indexes_of(StatColumnType.VALUE):
+      self._columns[indx][row] += other._columns[indx][other_row]
+
+  # Sets a typed column, DATE columns are expected to be day ordinals
+  def set_at(self, indx, row, value):
+    if self._types[indx] is StatColumnType.ID:
+      value = self._ids.code_of(value)
+    self._columns[indx][row] = value
+
+  # Pair of the day and the ID code of the row, rows with equal
+  # IDs have equal codes only within columns sharing an IDs dictionary.
+  def key_at(self, row):
+    day = self._columns[self._date_indx][row] if self._date_indx is not None else None
+    id_code = self._columns[self._id_indx][row] if self._id_indx is not None else None
+    return day, id_code
+
+  def row_at(self, row):
+    return [self.__raw_at(indx, row) for indx in range(len(self._types))]
+
+  def __raw_at(self, indx, row):
+    if self._types[indx] is StatColumnType.ID:
+      return self._ids.id_of(self._columns[indx][row])
+    return self._columns[indx][row]
+
+  def day_at(self, row):
+    if self._date_indx is None:
+      return None
+    return self._columns[self._date_indx][row]
+
+  def id_at(self, row):
+    if self._id_indx is None:
+      return None
+    return self._ids.id_of(self._columns[self._id_indx][row])
+
+  # Given rows which have one of given IDs, in same order
+  def rows_with_ids(self, rows, ids):
+    if self._id_indx is None:
+      raise ValueError('Cannot filter rows by IDs without ID column: {}'.format(self._types))
+    codes = set()
+    for id_str in ids:
+      code = self._ids.find_code(id_str)
+      if code is not None:
+        codes.add(code)
+    id_codes = self._columns[self._id_indx]
+    return array('i', [row for row in rows if id_codes[row] in codes])
+
+  # Given rows grouped by codes of their IDs, rows of each ID are in same order
+  def rows_by_id_codes(self, rows):
+    if self._id_indx is None:
+      raise ValueError('Cannot group rows by IDs without ID column: {}'.format(self._types))
+    id_codes = self._columns[self._id_indx]
+    groups = {}
+    for row in rows:
+      code = id_codes[row]
+      group = groups.get(code)
+      if group is None:
+        group = array('i')
+        groups[code] = group
+      group.append(row)
+    return groups
+
+  # Same as TypedStatsEntry.at(), but without building the entry
+  def at(self, indx, row):
+    if self._types[indx] is StatColumnType.DATE:
+      return DateCodec.day_to_date(self._columns[indx][row])
+    return self.__raw_at(indx, row)
+
+  def entry_at(self, row):
+    columns = []
+    for indx, stat_column_type in enumerate(self._types):
+      column = self._columns[indx][row]
+      if stat_column_type is StatColumnType.DATE:
+        columns.append(DateCodec.day_to_str(column))
+      elif stat_column_type is StatColumnType.VALUE:
+        columns.append(format_value(column))
+      elif stat_column_type is StatColumnType.ID:
+        columns.append(self._ids.id_of(column))
+      else:
+        columns.append(column)
+    return StatsEntry(columns)
+
+  # Text lines of given rows, same as str() of their entries, but made
+  # column by column, without building entries. Strings of days, IDs and
+  # values are made once per distinct day, ID and value.
+  def rows_to_strs(self, rows):
+    columns_strs = []
+    for indx, stat_column_type in enumerate(self._types):
+      column = self._columns[indx]
+      if stat_column_type is StatColumnType.DATE:
+        strs = __strs_of(column, rows, DateCodec.day_to_str)
+      elif stat_column_type is StatColumnType.VALUE:
+        strs = __strs_of(column, rows, format_value)
+      elif stat_column_type is StatColumnType.ID:
+        strs = __strs_of(column, rows, self._ids.id_of)
+      else:
+        strs = [column[row] for row in rows]
+      columns_strs.append(strs)
+    return [';'.join(row_strs) for row_strs in zip(*columns_strs)]
+
+  # The entry is created with already parsed columns
+  def typed_entry_at(self, row):
+    return TypedStatsEntry._from_typed_columns(self.entry_at(row), self._schema, self.__typed_row_at(row))
+
+  def __typed_row_at(self, row):
+    return [self.at(indx, row) for indx in range(len(self._types))]
+
+  # Makes new columns with given rows in given order.
+  # The IDs dictionary is shared with the new columns.
+  def take(self, rows):
+    result = StatsColumns(self._schema, self._ids)
+    for indx, column in enumerate(self._columns):
+      if isinstance(column, array):
+        result._columns[indx] = array(column.typecode, [column[row] for row in rows])
+      else:
+        result._columns[indx] = [column[row] for row in rows]
+    result._size = len(result._columns[0]) if len(result._columns) > 0 else 0
+    return result
+
+  # Returns columns sorted by date, most recent dates first.
+  # The sorting is stable. Already sorted columns are returned as is,
+  # which is checked with a single pass over the days.
+  def sorted_by_date(self):
+    if self._date_indx is None or self.is_sorted_by_date():
+      return self
+    days = self._columns[self._date_indx]
+    rows = sorted(range(self._size), key=days.__getitem__, reverse=True)
+    return self.take(rows)
+
+  def is_sorted_by_date(self):
+    if self._date_indx is None:
+      return True
+    days = self._columns[self._date_indx]
+    return all(map(operator.ge, days, islice(days, 1, None)))
@@ -0,0 +1,97 @@
+import unittest
+
+from array import array
+from datetime import datetime
+
+from core.stats.stats_columns import StatsColumns
+from core.stats.stats_entry import StatsEntry
+from core.stats.stat_column_type import StatColumnType
+
+class StatsColumnsTests(unittest.TestCase):
+  def setUp(self):
+    self.types = [StatColumnType.DATE, StatColumnType.VALUE, StatColumnType.ID, StatColumnType.COMMENT]
+
+  def test_entries_can_be_restored(self):
+    columns = StatsColumns(self.types)
+    columns.append_entry(StatsEntry.from_str('06/04/2019;1;hello;some comment'))
+    columns.append_entry(StatsEntry.from_str('07/04/2019;2.5;world;'))
+
+    self.assertEqual(2, len(columns))
+    self.assertEqual(StatsEntry.from_str('06/04/2019;1;hello;some comment'), columns.entry_at(0))
+    self.assertEqual(StatsEntry.from_str('07/04/2019;2.5;world;'), columns.entry_at(1))
+    self.assertEqual('07/04/2019;2.5;world;', str(columns.typed_entry_at(1)))
+
+  def test_columns_are_typed(self):
+    columns = StatsColumns(self.types)
+    columns.append_entry(StatsEntry.from_str('06/04/2019;123;hello;comment'))
+
+    self.assertEqual(datetime(2019, 4, 6), columns.at(0, 0))
+    self.assertEqual(123., columns.at(1, 0))
+    self.assertEqual('hello', columns.at(2, 0))
+    self.assertEqual('comment', columns.at(3, 0))
+    self.assertEqual(datetime(2019, 4, 6).toordinal(), columns.day_at(0))
+    self.assertEqual('hello', columns.id_at(0))
+
+  def test_ids_are_dictionary_encoded(self):
+    columns = StatsColumns(self.types)
+    columns.append_entry(StatsEntry.from_str('06/04/2019;1;hello;'))
+    columns.append_entry(StatsEntry.from_str('07/04/2019;1;world;'))
+    columns.append_entry(StatsEntry.from_str('08/04/2019;1;hello;'))
+
+    self.assertTrue(isinstance(columns._columns[2], array))
+    self.assertEqual([0, 1, 0], list(columns._columns[2]))
+    self.assertEqual('hello', columns.id_at(2))
+
+  def test_big_values_are_not_truncated(self):
+    columns = StatsColumns([StatColumnType.DATE, StatColumnType.VALUE])
+    columns.append_row([datetime(2019, 4, 6).toordinal(), 1234567.])
+    columns.append_row([datetime(2019, 4, 6).toordinal(), 0.1])
+    self.assertEqual('06/04/2019;1234567', str(columns.entry_at(0)))
+    self.assertEqual('06/04/2019;0.1', str(columns.entry_at(1)))
+
+  def test_sorting_by_date_is_stable(self):
+    columns = StatsColumns(self.types)
+    columns.append_entry(StatsEntry.from_str('06/04/2019;1;first;'))
+    columns.append_entry(StatsEntry.from_str('08/04/2019;1;second;'))
+    columns.append_entry(StatsEntry.from_str('06/04/2019;1;third;'))
+
+    columns = columns.sorted_by_date()
+    self.assertEqual(['second', 'first', 'third'], [columns.id_at(row) for row in range(len(columns))])
+
+  def test_sorted_columns_are_not_sorted_again(self):
+    columns = StatsColumns(self.types)
+    columns.append_entry(StatsEntry.from_str('08/04/2019;1;first;'))
+    columns.append_entry(StatsEntry.from_str('06/04/2019;1;second;'))
+    columns.append_entry(StatsEntry.from_str('06/04/2019;1;third;'))
+    self.assertTrue(columns.is_sorted_by_date())
+    self.assertTrue(columns is columns.sorted_by_date())
+
+    columns.append_entry(StatsEntry.from_str('07/04/2019;1;fourth;'))
+    self.assertFalse(columns.is_sorted_by_date())
+    self.assertTrue(columns.sorted_by_date().is_sorted_by_date())
+
+  def test_rows_can_be_copied_between_columns(self):
+    columns1 = StatsColumns(self.types)
+    columns1.append_entry(StatsEntry.from_str('06/04/2019;1;hello;'))
+    columns2 = StatsColumns(self.types)
+    columns2.append_entry(StatsEntry.from_str('07/04/2019;2;world;'))
+
+    columns2.append_from(columns1, 0)
+    self.assertEqual(StatsEntry.from_str('06/04/2019;1;hello;'), columns2.entry_at(1))
+
+  def test_throws_when_entry_does_not_match_types(self):
+    columns = StatsColumns(self.types)
+    exception_caught = False
+    try:
+      columns.append_entry(StatsEntry.from_str('06/04/2019;1;hello'))
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_throws_when_multiple_dates(self):
+    exception_caught = False
+    try:
+      StatsColumns([StatColumnType.DATE, StatColumnType.DATE])
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
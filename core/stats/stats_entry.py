@@ -1,5 +1,3 @@
-import re
-import math
 from datetime import datetime
 
 class StatsEntry:
@@ -1,60 +1,129 @@
 import os
-import shutil
-from datetime import datetime
 
 from core.stats.stats_entry import StatsEntry
 from core.stats.stats_cluster import StatsCluster
+from core.stats.mapped_stats_file import MappedStatsFile
+from core.stats import stats_journal
+from core.stats import stats_backups
+from core.stats import binary_stats_file
+from core.stats import stats_cache
 
-def load_from(file_path):
-  if not os.path.exists(file_path):
+# When a journal reaches any of the limits, it's compacted into its stats file
+JOURNAL_SEGMENTS_LIMIT = 64
+JOURNAL_SIZE_LIMIT = 16 * 1024 * 1024
+
+# The file can be either a text or a binary (see binary_stats_file) one,
+# the format is detected by the file's first bytes.
+# Segments of the file's journal (see write_into()) are applied to the loaded cluster.
+# With use_mmap a MappedStatsFile is returned instead of a StatsCluster,
+# it parses only the metadata and keeps entries in the file until they're asked for.
+# The MappedStatsFile must be closed by the caller. Note that it has only entries
+# of the file itself, without the journal, use compact() beforehand if needed.
+# Binary files cannot be loaded with use_mmap, they're loaded fast anyway.
+# With use_cache the parsed file is cached next to it (see stats_cache),
+# so that the file is not parsed again until it's changed.
+# With a StatsRowsFilter only rows which pass it are loaded, rows of text files
+# and journals are filtered before they're parsed. Cached and binary files
+# are filtered after loading, which is cheap for them.
+def load_from(file_path, use_mmap=False, use_cache=False, rows_filter=None):
+  if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
     return None
 
-  with open(file_path, 'r') as text_file:
-    text = text_file.read()
+  binary = binary_stats_file.is_binary_file(file_path)
+  if use_mmap:
+    if binary:
+      raise ValueError('Binary stats files cannot be memory-mapped: {}'.format(file_path))
+    if rows_filter is not None:
+      raise ValueError('Memory-mapped stats files cannot be filtered: {}'.format(file_path))
+    return MappedStatsFile(file_path)
+  stats_cluster = stats_cache.load(file_path) if use_cache else None
+  if stats_cluster is None:
+    if binary:
+      with open(file_path, 'rb') as binary_file:
+        stats_cluster = binary_stats_file.load(binary_file)
+    else:
+      with open(file_path, 'r') as text_file:
+        # The cache must have the whole file, so the rows are filtered after loading then
+        stats_cluster = StatsCluster.load(text_file, None if use_cache else rows_filter)
+    if use_cache:
+      try:
+        stats_cache.store(file_path, stats_cluster)
+      except OSError:
+        pass # The cache is only an optimization, e.g. the dir can be read-only
+  if rows_filter is not None and (binary or use_cache):
+    stats_cluster = rows_filter.apply(stats_cluster)
+  segments = stats_journal.read_segments(file_path, stats_cluster.metadata(), rows_filter)
+  return stats_journal.apply_segments(stats_cluster, segments)
 
-  if len(text) == 0:
-    return None
-  return StatsCluster.from_str(text)
+# Existing files keep their format, new files are binary if they have
+# the binary_stats_file.FILE_EXTENSION extension, see write_as()
+def __write_cluster(file_path, stats_cluster):
+  if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+    binary = binary_stats_file.is_binary_file(file_path)
+  else:
+    binary = file_path.endswith(binary_stats_file.FILE_EXTENSION)
+  write_as(file_path, stats_cluster, binary)
 
-def __handle_backups_before_writing(file_path, backup_dir_path, backups_limit):
-  if not os.path.exists(file_path) or backup_dir_path is None:
-    return
-  if not os.path.exists(backup_dir_path):
-    os.makedirs(backup_dir_path)
-  
-  if backups_limit is not None:
-    backup_files = os.listdir(backup_dir_path) 
-    backup_files_and_microseconds = []
-    for backup_file in backup_files:
-      backup_word_index = backup_file.rfind('.backup')
-      if backup_word_index == -1:
-        continue
-      backup_file_name_cut = backup_file[:backup_word_index]
-      time_delimiter_index = backup_file_name_cut.rfind('_')
-      if time_delimiter_index == -1:
-        continue
-      creation_time_microseconds = float(backup_file_name_cut[time_delimiter_index+1:])
-      backup_files_and_microseconds.append((backup_file, creation_time_microseconds))
-    backup_files_and_microseconds = sorted(backup_files_and_microseconds,
-                                           key=lambda bfam_pair: bfam_pair[1])
-    while len(backup_files_and_microseconds) > backups_limit - 1:
-      backup_file_path = os.path.join(backup_dir_path, backup_files_and_microseconds[0][0])
-      backup_files_and_microseconds.pop(0)
-      os.remove(backup_file_path)
-
-  file_name = os.path.basename(file_path)
-  backup_file_name = '{}_{}.backup'.format(file_name, str(datetime.now().timestamp()))
-  shutil.copyfile(file_path, os.path.join(backup_dir_path, backup_file_name))
+# Writes the cluster into the file, replacing its contents,
+# in the binary format (see binary_stats_file) or the text one.
+def write_as(file_path, stats_cluster, binary):
+  dir_path = os.path.dirname(file_path)
+  if len(dir_path) > 0 and not os.path.exists(dir_path):
+    os.makedirs(dir_path)
+  if binary:
+    with open(file_path, 'wb') as binary_file:
+      binary_stats_file.write(binary_file, stats_cluster)
+  else:
+    with open(file_path, 'w') as text_file:
+      stats_cluster.write_to(text_file)
+  # The written cluster is already parsed, so an existing cache is updated right away
+  if os.path.exists(stats_cache.cache_path_of(file_path)):
+    stats_cache.store(file_path, stats_cluster)
 
 # Writes given entries into the given file.
 # Doesn't remove already existing entries from the given file,
 # instead, uses StatsEntry.merge() to merge old entries and new.
-def write_into(file_path, stats_cluster, backup_dir_path=None, backups_limit=None):
-  __handle_backups_before_writing(file_path, backup_dir_path, backups_limit)
+# With journal=True, if the file already exists, it's not rewritten,
+# instead the entries are appended to the journal of the file,
+# which is compacted when it becomes too big (see compact()).
+# Backups are made only if the file is changed since its latest backup,
+# see stats_backups.
+def write_into(file_path, stats_cluster, backup_dir_path=None, backups_limit=None, journal=False,
+               compress_backups=False):
+  if journal and os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+    __append_to_journal(file_path, stats_cluster)
+    if (stats_journal.segments_count(file_path) >= JOURNAL_SEGMENTS_LIMIT
+        or stats_journal.journal_size(file_path) >= JOURNAL_SIZE_LIMIT):
+      compact(file_path, backup_dir_path, backups_limit, compress_backups)
+    return
+
+  stats_backups.make_backup(file_path, backup_dir_path, backups_limit, compress_backups)
   existing_cluster = load_from(file_path)
   if existing_cluster is not None:
     stats_cluster = stats_cluster.merge(existing_cluster, prioritized=stats_cluster)
-  if not os.path.exists(os.path.dirname(file_path)):
-    os.makedirs(os.path.dirname(file_path))
-  with open(file_path, 'w') as text_file:
-    text_file.write(str(stats_cluster))
+  __write_cluster(file_path, stats_cluster)
+  # The journal is already merged into the file
+  stats_journal.remove_journal(file_path)
+
+def __append_to_journal(file_path, stats_cluster):
+  if binary_stats_file.is_binary_file(file_path):
+    with open(file_path, 'rb') as binary_file:
+      metadata = binary_stats_file.load_metadata(binary_file)
+  else:
+    with open(file_path, 'r') as text_file:
+      metadata = StatsCluster.load_metadata(text_file)
+  if metadata != stats_cluster.metadata():
+    raise ValueError('Metadata of the file and the cluster must be same, but it isn\'t: {}, {}'.format(
+      metadata, stats_cluster.metadata()))
+  stats_journal.append_segment(file_path, stats_cluster)
+
+# Folds the journal of the file (see write_into()) back into the file.
+# Note that if the journal is not removed because of a crash, applying it
+# to the compacted file again doesn't change anything.
+def compact(file_path, backup_dir_path=None, backups_limit=None, compress_backups=False):
+  if not os.path.exists(stats_journal.journal_path_of(file_path)):
+    return
+  stats_cluster = load_from(file_path)
+  stats_backups.make_backup(file_path, backup_dir_path, backups_limit, compress_backups)
+  __write_cluster(file_path, stats_cluster)
+  stats_journal.remove_journal(file_path)
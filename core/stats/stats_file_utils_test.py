@@ -3,10 +3,20 @@ from core import test_utils
 
 import os
 
+from datetime import datetime
+
 from core.stats import stats_file_utils
+from core.stats import stats_backups
+from core.stats import binary_stats_file
+from core.stats import stats_cache
 from core.stats.stats_entry import StatsEntry
 from core.stats.stats_metadata import StatsMetadata
 from core.stats.stats_cluster import StatsCluster
+from core.stats.stats_rows_filter import StatsRowsFilter
+
+# Names of backups in the dir, without the manifest
+def _StatsFileUtilsTests__backup_files_in(backup_dir_path):
+  return [backup.file_name for backup in stats_backups.list_backups(backup_dir_path)]
 
 class StatsFileUtilsTests(unittest.TestCase):
   def test_can_load_stats_from_file(self):
@@ -82,10 +92,10 @@ class StatsFileUtilsTests(unittest.TestCase):
                      StatsEntry.from_str('09/04/2019;2;world')]
     backup_folder = test_utils.make_tmp_dir()
     
-    self.assertEqual(0, len(os.listdir(backup_folder)))
+    self.assertEqual(0, len(__backup_files_in(backup_folder)))
     stats_file_utils.write_into(file_path, StatsCluster(metadata, stats_entries), backup_dir_path=backup_folder)
 
-    backup_files = os.listdir(backup_folder)
+    backup_files = __backup_files_in(backup_folder)
     backup_file_path = os.path.join(backup_folder, backup_files[0])
     with open(backup_file_path, 'r') as opened_file:
       backup = opened_file.read()
@@ -97,19 +107,19 @@ class StatsFileUtilsTests(unittest.TestCase):
     metadata = StatsMetadata.from_str('date;value;comment')
 
     backup_folder = test_utils.make_tmp_dir()
-    self.assertEqual(0, len(os.listdir(backup_folder)))
+    self.assertEqual(0, len(__backup_files_in(backup_folder)))
     stats_file_utils.write_into(file_path,
                                 StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello')]),
                                 backup_dir_path=backup_folder)
-    self.assertEqual(1, len(os.listdir(backup_folder)))
+    self.assertEqual(1, len(__backup_files_in(backup_folder)))
     stats_file_utils.write_into(file_path,
                                 StatsCluster(metadata, [StatsEntry.from_str('07/04/2019;1;hello')]),
                                 backup_dir_path=backup_folder)
-    self.assertEqual(2, len(os.listdir(backup_folder)))
+    self.assertEqual(2, len(__backup_files_in(backup_folder)))
     stats_file_utils.write_into(file_path,
                                 StatsCluster(metadata, [StatsEntry.from_str('07/04/2019;1;hello')]),
                                 backup_dir_path=backup_folder)
-    self.assertEqual(3, len(os.listdir(backup_folder)))
+    self.assertEqual(3, len(__backup_files_in(backup_folder)))
 
   def test_can_remove_too_old_backups(self):
     initial_file_contents = ''
@@ -134,7 +144,7 @@ class StatsFileUtilsTests(unittest.TestCase):
                                 backup_dir_path=backup_folder,
                                 backups_limit=2)
     
-    backup_files = os.listdir(backup_folder)
+    backup_files = __backup_files_in(backup_folder)
     self.assertEqual(2, len(backup_files))
 
     backups = []
@@ -150,3 +160,158 @@ class StatsFileUtilsTests(unittest.TestCase):
     file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), initial_file_contents)
     stats_cluster = stats_file_utils.load_from(file_path)
     self.assertEqual(None, stats_cluster)
+
+  def test_can_load_stats_from_file_with_mmap(self):
+    file_contents = 'date;value;id\n07/04/2019;2;world\n06/04/2019;1;hello'
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), file_contents)
+    with stats_file_utils.load_from(file_path, use_mmap=True) as stats_file:
+      self.assertEqual(StatsMetadata.from_str('date;value;id'), stats_file.metadata())
+      self.assertEqual(2, len(stats_file))
+      self.assertEqual(StatsEntry.from_str('07/04/2019;2;world'), stats_file.entry_at(0))
+
+  def test_journal_write_does_not_rewrite_file(self):
+    initial_file_contents = 'date;value;id\n06/04/2019;1;hello\n08/04/2019;2;world'
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), initial_file_contents)
+    metadata = StatsMetadata.from_str('date;value;id')
+
+    stats_file_utils.write_into(file_path,
+                                StatsCluster(metadata, [StatsEntry.from_str('07/04/2019;1;wonderful'),
+                                                        StatsEntry.from_str('08/04/2019;3;world')]),
+                                journal=True)
+    with open(file_path, 'r') as opened_file:
+      self.assertEqual(initial_file_contents, opened_file.read())
+
+    stats_cluster = stats_file_utils.load_from(file_path)
+    self.assertEqual([StatsEntry.from_str('08/04/2019;3;world'),
+                      StatsEntry.from_str('07/04/2019;1;wonderful'),
+                      StatsEntry.from_str('06/04/2019;1;hello')], stats_cluster.entries())
+
+  def test_newest_journal_segments_win(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    metadata = StatsMetadata.from_str('date;value;id')
+    stats_file_utils.write_into(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;2;hello')]),
+                                journal=True)
+    stats_file_utils.write_into(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;3;hello')]),
+                                journal=True)
+    self.assertEqual([StatsEntry.from_str('06/04/2019;3;hello')], stats_file_utils.load_from(file_path).entries())
+
+  def test_journal_can_be_compacted(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    metadata = StatsMetadata.from_str('date;value;id')
+    stats_file_utils.write_into(file_path, StatsCluster(metadata, [StatsEntry.from_str('07/04/2019;2;hello')]),
+                                journal=True)
+    self.assertTrue(os.path.exists(file_path + '.journal'))
+
+    stats_file_utils.compact(file_path)
+    self.assertFalse(os.path.exists(file_path + '.journal'))
+    with open(file_path, 'r') as opened_file:
+      self.assertEqual('date;value;id\n07/04/2019;2;hello\n06/04/2019;1;hello', opened_file.read())
+
+  def test_journal_is_compacted_when_it_has_too_many_segments(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    metadata = StatsMetadata.from_str('date;value;id')
+    for indx in range(stats_file_utils.JOURNAL_SEGMENTS_LIMIT):
+      self.assertTrue(indx == 0 or os.path.exists(file_path + '.journal'))
+      stats_file_utils.write_into(file_path, StatsCluster(metadata, [StatsEntry.from_str('07/04/2019;{};hello'.format(indx))]),
+                                  journal=True)
+    self.assertFalse(os.path.exists(file_path + '.journal'))
+    self.assertEqual(StatsEntry.from_str('07/04/2019;{};hello'.format(stats_file_utils.JOURNAL_SEGMENTS_LIMIT - 1)),
+                     stats_file_utils.load_from(file_path).entries()[0])
+
+  def test_journal_write_throws_when_metadata_differs(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    exception_caught = False
+    try:
+      stats_file_utils.write_into(file_path,
+                                  StatsCluster(StatsMetadata.from_str('date;value;comment'),
+                                               [StatsEntry.from_str('07/04/2019;2;hello')]),
+                                  journal=True)
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+    self.assertFalse(os.path.exists(file_path + '.journal'))
+
+  def test_can_load_binary_stats_file(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), '')
+    metadata = StatsMetadata.from_str('date;value;id')
+    stats_file_utils.write_as(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello')]),
+                              binary=True)
+    self.assertTrue(binary_stats_file.is_binary_file(file_path))
+
+    stats_cluster = stats_file_utils.load_from(file_path)
+    self.assertEqual(metadata, stats_cluster.metadata())
+    self.assertEqual([StatsEntry.from_str('06/04/2019;1;hello')], stats_cluster.entries())
+
+  def test_binary_file_stays_binary_after_write(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), '')
+    metadata = StatsMetadata.from_str('date;value;id')
+    stats_file_utils.write_as(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello')]),
+                              binary=True)
+    stats_file_utils.write_into(file_path, StatsCluster(metadata, [StatsEntry.from_str('07/04/2019;1;world')]))
+
+    self.assertTrue(binary_stats_file.is_binary_file(file_path))
+    self.assertEqual([StatsEntry.from_str('07/04/2019;1;world'),
+                      StatsEntry.from_str('06/04/2019;1;hello')], stats_file_utils.load_from(file_path).entries())
+
+  def test_new_file_with_binary_extension_is_binary(self):
+    file_path = os.path.join(test_utils.make_tmp_dir(), 'stats' + binary_stats_file.FILE_EXTENSION)
+    metadata = StatsMetadata.from_str('date;value;id')
+    stats_file_utils.write_into(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello')]))
+    self.assertTrue(binary_stats_file.is_binary_file(file_path))
+
+  def test_journal_can_be_appended_to_binary_file(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), '')
+    metadata = StatsMetadata.from_str('date;value;id')
+    stats_file_utils.write_as(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello')]),
+                              binary=True)
+    stats_file_utils.write_into(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;2;hello')]),
+                                journal=True)
+    self.assertEqual([StatsEntry.from_str('06/04/2019;2;hello')], stats_file_utils.load_from(file_path).entries())
+
+  def test_can_load_stats_with_cache(self):
+    file_contents = 'date;value;id\n07/04/2019;2;world\n06/04/2019;1;hello'
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), file_contents)
+    stats_cluster = stats_file_utils.load_from(file_path, use_cache=True)
+    self.assertTrue(os.path.exists(stats_cache.cache_path_of(file_path)))
+
+    cached_cluster = stats_file_utils.load_from(file_path, use_cache=True)
+    self.assertEqual(stats_cluster.entries(), cached_cluster.entries())
+
+  def test_write_updates_cache(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    stats_file_utils.load_from(file_path, use_cache=True)
+    metadata = StatsMetadata.from_str('date;value;id')
+    stats_file_utils.write_into(file_path, StatsCluster(metadata, [StatsEntry.from_str('07/04/2019;1;world')]))
+
+    self.assertEqual([StatsEntry.from_str('07/04/2019;1;world'),
+                      StatsEntry.from_str('06/04/2019;1;hello')], stats_cache.load(file_path).entries())
+
+  def test_can_load_filtered_rows(self):
+    file_contents = 'date;value;id\n05/04/2019;1;hello\n06/04/2019;2;world\n07/04/2019;3;hello\n08/04/2019;4;hello'
+    metadata = StatsMetadata.from_str('date;value;id')
+    rows_filter = StatsRowsFilter(datetime(2019, 4, 6), datetime(2019, 4, 7), ['hello'])
+    for binary in [False, True]:
+      for use_cache in [False, True]:
+        file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), file_contents)
+        if binary:
+          stats_file_utils.write_as(file_path, StatsCluster.from_str(file_contents), binary=True)
+        stats_file_utils.write_into(file_path, StatsCluster(metadata, [StatsEntry.from_str('07/04/2019;5;hello'),
+                                                                       StatsEntry.from_str('06/04/2019;6;hello')]),
+                                    journal=True)
+        stats_cluster = stats_file_utils.load_from(file_path, use_cache=use_cache, rows_filter=rows_filter)
+        self.assertEqual([StatsEntry.from_str('07/04/2019;5;hello'),
+                          StatsEntry.from_str('06/04/2019;6;hello')], stats_cluster.entries())
+
+  def test_filtered_out_rows_are_not_parsed(self):
+    file_contents = 'date;value;id\n05/04/2019;not a number;hello\n06/04/2019;2;world'
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), file_contents)
+    stats_cluster = stats_file_utils.load_from(file_path, rows_filter=StatsRowsFilter(ids=['world']))
+    self.assertEqual([StatsEntry.from_str('06/04/2019;2;world')], stats_cluster.entries())
+
+  def test_can_load_with_cache_when_cache_cannot_be_written(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id\n06/04/2019;1;hello')
+    # The temporary file of the cache cannot be created
+    os.makedirs('{}.{}.tmp'.format(stats_cache.cache_path_of(file_path), os.getpid()))
+    stats_cluster = stats_file_utils.load_from(file_path, use_cache=True)
+    self.assertEqual([StatsEntry.from_str('06/04/2019;1;hello')], stats_cluster.entries())
+    self.assertFalse(os.path.exists(stats_cache.cache_path_of(file_path)))
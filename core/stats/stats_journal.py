@@ -0,0 +1,109 @@
+import os
+from datetime import datetime
+
+from core.stats.stats_columns import StatsColumns
+from core.stats.stats_cluster import StatsCluster
+
+# Journal of a stats file is a file next to it, with clusters appended
+# to it as segments instead of rewriting the stats file.
+# Each segment starts with a marker line followed by entries of the cluster,
+# metadata is not written because it must be same as metadata of the stats file.
+# Segments appended later have priority over earlier segments and the stats file,
+# same as StatsCluster.merge() with the newer cluster prioritized.
+
+SEGMENT_MARKER = '### segment'
+
+def journal_path_of(file_path):
+  return file_path + '.journal'
+
+# Number of the journal segments is kept in a file next to the journal,
+# so that the journal is not read on each append to count them
+def __segments_count_path_of(file_path):
+  return journal_path_of(file_path) + '.count'
+
+def append_segment(file_path, stats_cluster):
+  if not stats_cluster.is_collapsed():
+    raise ValueError('Only collapsed clusters can be appended to a journal: {}'.format(stats_cluster))
+  count = segments_count(file_path)
+  # Until the segment is appended the count is unknown, so that it's recounted after a crash
+  __remove_segments_count(file_path)
+  with open(journal_path_of(file_path), 'a') as journal_file:
+    journal_file.write('{} {}\n'.format(SEGMENT_MARKER, datetime.now().timestamp()))
+    for entry in stats_cluster.iter_entries():
+      journal_file.write(str(entry))
+      journal_file.write('\n')
+  __write_segments_count(file_path, count + 1)
+
+def segments_count(file_path):
+  journal_path = journal_path_of(file_path)
+  if not os.path.exists(journal_path):
+    return 0
+  try:
+    with open(__segments_count_path_of(file_path), 'r') as count_file:
+      return int(count_file.read())
+  except (OSError, ValueError):
+    pass
+  # No count (a journal of an interrupted append), segments are counted once
+  count = 0
+  with open(journal_path, 'r') as journal_file:
+    for line in journal_file:
+      if line.startswith(SEGMENT_MARKER):
+        count += 1
+  __write_segments_count(file_path, count)
+  return count
+
+def __remove_segments_count(file_path):
+  if os.path.exists(__segments_count_path_of(file_path)):
+    os.remove(__segments_count_path_of(file_path))
+
+def __write_segments_count(file_path, count):
+  with open(__segments_count_path_of(file_path), 'w') as count_file:
+    count_file.write(str(count))
+
+def journal_size(file_path):
+  journal_path = journal_path_of(file_path)
+  if not os.path.exists(journal_path):
+    return 0
+  return os.path.getsize(journal_path)
+
+# Clusters of the journal segments, oldest first.
+# With a StatsRowsFilter, rows which don't pass it are skipped before they're parsed.
+def read_segments(file_path, metadata, rows_filter=None):
+  journal_path = journal_path_of(file_path)
+  if not os.path.exists(journal_path):
+    return []
+  segments = []
+  columns = None
+  predicate = None
+  if rows_filter is not None and not rows_filter.is_empty():
+    predicate = rows_filter.strs_predicate(metadata.schema())
+  with open(journal_path, 'r') as journal_file:
+    for line in journal_file:
+      if line.startswith(SEGMENT_MARKER):
+        if columns is not None:
+          segments.append(StatsCluster._from_columns(metadata, columns))
+        columns = StatsColumns(metadata.schema())
+        continue
+      line = line.strip()
+      if len(line) == 0:
+        continue
+      if columns is None:
+        raise ValueError('Journal {} doesn\'t start with a segment marker'.format(journal_path))
+      columns_strs = line.split(';')
+      if predicate is None or predicate(columns_strs):
+        columns.append_strs(columns_strs)
+  if columns is not None:
+    segments.append(StatsCluster._from_columns(metadata, columns))
+  return segments
+
+# Applies journal segments to the cluster of the stats file
+def apply_segments(stats_cluster, segments):
+  if len(segments) == 0:
+    return stats_cluster
+  return StatsCluster.merge_many(list(reversed(segments)) + [stats_cluster])
+
+def remove_journal(file_path):
+  journal_path = journal_path_of(file_path)
+  if os.path.exists(journal_path):
+    os.remove(journal_path)
+  __remove_segments_count(file_path)
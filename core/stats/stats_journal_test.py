@@ -0,0 +1,72 @@
+import unittest
+from core import test_utils
+
+import os
+
+from core.stats import stats_journal
+from core.stats.stats_entry import StatsEntry
+from core.stats.stats_metadata import StatsMetadata
+from core.stats.stats_cluster import StatsCluster
+
+class StatsJournalTests(unittest.TestCase):
+  def test_can_append_and_read_segments(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id')
+    metadata = StatsMetadata.from_str('date;value;id')
+    self.assertEqual(0, stats_journal.segments_count(file_path))
+    self.assertEqual([], stats_journal.read_segments(file_path, metadata))
+
+    stats_journal.append_segment(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello'),
+                                                                    StatsEntry.from_str('07/04/2019;1;world')]))
+    stats_journal.append_segment(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;2;hello')]))
+
+    self.assertEqual(2, stats_journal.segments_count(file_path))
+    self.assertTrue(stats_journal.journal_size(file_path) > 0)
+    segments = stats_journal.read_segments(file_path, metadata)
+    self.assertEqual(2, len(segments))
+    self.assertEqual([StatsEntry.from_str('07/04/2019;1;world'), StatsEntry.from_str('06/04/2019;1;hello')],
+                     segments[0].entries())
+    self.assertEqual([StatsEntry.from_str('06/04/2019;2;hello')], segments[1].entries())
+
+    stats_journal.remove_journal(file_path)
+    self.assertEqual(0, stats_journal.segments_count(file_path))
+
+  def test_segments_are_counted_without_reading_journal(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id')
+    metadata = StatsMetadata.from_str('date;value;id')
+    for indx in range(3):
+      stats_journal.append_segment(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello')]))
+    # A segment not counted by append_segment()
+    with open(stats_journal.journal_path_of(file_path), 'a') as journal_file:
+      journal_file.write('{}\n06/04/2019;2;hello\n'.format(stats_journal.SEGMENT_MARKER))
+    self.assertEqual(3, stats_journal.segments_count(file_path))
+
+    # Without the count (e.g. after a crash) the segments are counted
+    os.remove(stats_journal.journal_path_of(file_path) + '.count')
+    self.assertEqual(4, stats_journal.segments_count(file_path))
+    stats_journal.append_segment(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello')]))
+    self.assertEqual(5, stats_journal.segments_count(file_path))
+
+    stats_journal.remove_journal(file_path)
+    self.assertFalse(os.path.exists(stats_journal.journal_path_of(file_path) + '.count'))
+    self.assertEqual(0, stats_journal.segments_count(file_path))
+
+  def test_later_segments_are_prioritized(self):
+    metadata = StatsMetadata.from_str('date;value;id')
+    cluster = StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello'),
+                                      StatsEntry.from_str('07/04/2019;1;world')])
+    segments = [StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;2;hello')]),
+                StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;3;hello')])]
+    cluster = stats_journal.apply_segments(cluster, segments)
+    self.assertEqual([StatsEntry.from_str('07/04/2019;1;world'), StatsEntry.from_str('06/04/2019;3;hello')],
+                     cluster.entries())
+
+  def test_only_collapsed_clusters_can_be_appended(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), 'date;value;id')
+    metadata = StatsMetadata.from_str('date;value;id')
+    exception_caught = False
+    try:
+      stats_journal.append_segment(file_path, StatsCluster(metadata, [StatsEntry.from_str('06/04/2019;1;hello'),
+                                                                      StatsEntry.from_str('06/04/2019;1;hello')]))
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
@@ -1,9 +1,40 @@
-import copy
 import sys
-import yaml
+
+from types import MappingProxyType
 
 from core.stats.stat_column_type import StatColumnType
+from core.stats.stats_schema import StatsSchema
+
+# Read-only copy of a YAML object: dicts are wrapped into MappingProxyType,
+# lists become tuples and sets become frozensets
+def _StatsMetadata__freeze(obj):
+  if isinstance(obj, dict):
+    return MappingProxyType({key: _StatsMetadata__freeze(value) for key, value in obj.items()})
+  if isinstance(obj, (list, tuple)):
+    return tuple(_StatsMetadata__freeze(item) for item in obj)
+  if isinstance(obj, (set, frozenset)):
+    return frozenset(obj)
+  return obj
+
+# Modifiable copy of a frozen object, see __freeze()
+def _StatsMetadata__thaw(obj):
+  if isinstance(obj, MappingProxyType):
+    return {key: _StatsMetadata__thaw(value) for key, value in obj.items()}
+  if isinstance(obj, tuple):
+    return [_StatsMetadata__thaw(item) for item in obj]
+  if isinstance(obj, frozenset):
+    return set(obj)
+  return obj
 
+# PyYAML is imported only when complex metadata is met, because importing it
+# takes a noticeable part of scripts startup. Its C loader is used when available.
+def _StatsMetadata__yaml_load(string):
+  import yaml
+  loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+  return yaml.load(string, Loader=loader)
+
+# Metadata is immutable, its str() is computed once and is
+# used for equality and hashing, so metadata can be used as dict keys.
 class StatsMetadata:
   def __init__(self, stat_column_types, stat_column_types_extras=None, raw_metadata={}):
     if stat_column_types_extras is None:
@@ -11,9 +42,13 @@ class StatsMetadata:
     if len(stat_column_types) != len(stat_column_types_extras):
       raise ValueError('Sizes of types and extras must be equal: {}, {}'.format(
         stat_column_types, stat_column_types_extras))
-    self._stat_column_types = stat_column_types
-    self._stat_column_types_extras = stat_column_types_extras
-    self._raw_metadata = raw_metadata
+    self._stat_column_types = tuple(stat_column_types)
+    self._stat_column_types_extras = tuple(stat_column_types_extras)
+    # A frozen copy, so that the metadata doesn't change with the given object
+    self._raw_metadata = __freeze(raw_metadata)
+    self._schema = StatsSchema.of(stat_column_types)
+    self._str = None
+    self._hash = None
 
   def types(self):
     return list(self._stat_column_types)
@@ -21,10 +56,26 @@ class StatsMetadata:
   def types_extras(self):
     return list(self._stat_column_types_extras)
 
+  # Same as types() and types_extras(), but tuples, without copying
+  def types_view(self):
+    return self._stat_column_types
+
+  def types_extras_view(self):
+    return self._stat_column_types_extras
+
+  # Column positions of the types, compiled once
+  def schema(self):
+    return self._schema
+
   # YAML text converted to a Python object (list of dicts).
   # The function always returns a copy - feel free to modify it.
   def raw_metadata(self):
-    return copy.deepcopy(self._raw_metadata)
+    return __thaw(self._raw_metadata)
+
+  # Same as raw_metadata(), but read-only and without copying:
+  # dicts are MappingProxyType, lists are tuples.
+  def raw_metadata_view(self):
+    return self._raw_metadata
 
   @staticmethod
   def from_str(string):
@@ -73,7 +124,7 @@ class StatsMetadata:
     if sys.version_info[0] < 3 and sys.version_info[1] < 7:
       raise EnvironmentError('Because of dict ordering guarantees, python 3.7 required ({} was run).'.format(sys.version_info)
                              + ' See https://docs.python.org/3/whatsnew/3.7.html')
-    metadata_dict = yaml.safe_load(string)
+    metadata_dict = __yaml_load(string)
     types = None
     types_extras = None
     for metadata_entry in metadata_dict:
@@ -101,14 +152,25 @@ class StatsMetadata:
     return start, end
 
   def __eq__(self, other):
+    if self is other:
+      return True
     if isinstance(other, StatsMetadata):
-      return str(self) == str(other)
+      return hash(self) == hash(other) and str(self) == str(other)
     return False
 
+  def __hash__(self):
+    if self._hash is None:
+      self._hash = hash(str(self))
+    return self._hash
+
   def __str__(self):
-    if len(self._raw_metadata) == 0:
-      return self._types_to_str()
-    return '===\n{}==='.format(yaml.dump(self._raw_metadata, sort_keys=False))
+    if self._str is None:
+      if len(self._raw_metadata) == 0:
+        self._str = self._types_to_str()
+      else:
+        import yaml
+        self._str = '===\n{}==='.format(yaml.dump(self.raw_metadata(), sort_keys=False))
+    return self._str
 
   def _types_to_str(self):
     stat_column_types_strs = []
@@ -152,3 +152,40 @@ date;value
     self.assertEqual('date;id', metadata.raw_metadata()[0]['value'])
     metadata.raw_metadata()[0]['value'] = 'corrupted value'
     self.assertEqual('date;id', metadata.raw_metadata()[0]['value'])
+
+  def test_equal_metadata_have_equal_hashes(self):
+    string = '===\n- what: format\n  value: date;id\n===\n'
+    first = StatsMetadata.from_str(string)
+    second = StatsMetadata.from_str(string)
+    self.assertEqual(first, second)
+    self.assertEqual(hash(first), hash(second))
+    metadata_dict = {first: 'hello'}
+    self.assertEqual('hello', metadata_dict[second])
+    self.assertNotEqual(first, StatsMetadata.from_str('date;id'))
+
+  def test_raw_metadata_view_is_read_only(self):
+    string = '===\n- what: format\n  value: date;id\n  list: [1, 2]\n===\n'
+    metadata = StatsMetadata.from_str(string)
+    raw_metadata_view = metadata.raw_metadata_view()
+    self.assertEqual('date;id', raw_metadata_view[0]['value'])
+    self.assertEqual((1, 2), raw_metadata_view[0]['list'])
+    exception_caught = False
+    try:
+      raw_metadata_view[0]['value'] = 'corrupted value'
+    except TypeError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_metadata_doesnt_change_with_given_raw_metadata(self):
+    raw_metadata = [{'what': 'format', 'value': 'date;id'}]
+    metadata = StatsMetadata([StatColumnType.DATE, StatColumnType.ID], None, raw_metadata)
+    metadata_str = str(metadata)
+    raw_metadata[0]['value'] = 'corrupted value'
+    self.assertEqual('date;id', metadata.raw_metadata()[0]['value'])
+    self.assertEqual(metadata_str, str(metadata))
+
+  def test_types_views_are_same_as_copies(self):
+    metadata = StatsMetadata.from_str('date;value:sp;id')
+    self.assertEqual(tuple(metadata.types()), metadata.types_view())
+    self.assertEqual(tuple(metadata.types_extras()), metadata.types_extras_view())
+    self.assertTrue(metadata.types_view() is metadata.types_view())
@@ -0,0 +1,156 @@
+from datetime import date
+
+from core.stats.stats_cluster import StatsCluster
+from core.stats.stats_cluster_builder import StatsClusterBuilder
+from core.stats.stats_metadata import StatsMetadata
+from core.stats.stats_rows_filter import StatsRowsFilter
+from core.stats.stat_column_type import StatColumnType
+from core.stats.date_codec import DateCodec
+from core.stats import stats_file_utils
+from core.chart.modifiers.period_chart_modifier import PeriodChartModifier
+
+# Group keys of StatsQuery.group_by(), dates are grouped by units of PeriodChartModifier
+_UNITS_BY_KEYS = {
+  'day': PeriodChartModifier.Unit.DAY,
+  'days': PeriodChartModifier.Unit.DAY,
+  'month': PeriodChartModifier.Unit.MONTH,
+  'months': PeriodChartModifier.Unit.MONTH,
+  'year': PeriodChartModifier.Unit.YEAR,
+  'years': PeriodChartModifier.Unit.YEAR,
+}
+_ID_KEY = 'id'
+
+# Query of a stats file or of a StatsCluster, for example:
+#   query('stats.cvs').where(start_date=datetime(2019, 1, 1), ids=['a', 'b']).group_by('month', 'id').sum('sp')
+# where() and group_by() return new queries, the query runs when its result is asked for.
+# Rows of stats files which don't pass where() are skipped by the loader before
+# they're parsed (see stats_file_utils.load_from()).
+def query(file_path_or_cluster):
+  return StatsQuery(file_path_or_cluster)
+
+class StatsQuery:
+  def __init__(self, source, rows_filter=None, group_keys=None):
+    self._source = source
+    self._rows_filter = rows_filter if rows_filter is not None else StatsRowsFilter()
+    self._group_keys = group_keys
+
+  # Keeps only rows with dates between given dates (both inclusive) and with given IDs,
+  # same as StatsCluster.slice(). Several where() calls keep rows which pass all of them.
+  def where(self, start_date=None, end_date=None, ids=None):
+    rows_filter = self._rows_filter.intersect(StatsRowsFilter(start_date, end_date, ids))
+    return StatsQuery(self._source, rows_filter, self._group_keys)
+
+  # Keys are 'id' and a date unit: 'day', 'month' or 'year'.
+  # Without a date unit all dates are summed, without 'id' all IDs are summed.
+  def group_by(self, *keys):
+    units = []
+    for key in keys:
+      if key in _UNITS_BY_KEYS:
+        units.append(_UNITS_BY_KEYS[key])
+      elif isinstance(key, PeriodChartModifier.Unit):
+        units.append(key)
+      elif key != _ID_KEY:
+        raise ValueError('Unknown group key: {}'.format(key))
+    if len(units) > 1:
+      raise ValueError('Only one date unit can be grouped by: {}'.format(list(keys)))
+    return StatsQuery(self._source, self._rows_filter, list(keys))
+
+  # The filtered cluster, None if the stats file doesn't exist
+  def cluster(self):
+    if isinstance(self._source, StatsCluster):
+      return self._rows_filter.apply(self._source)
+    return stats_file_utils.load_from(self._source, rows_filter=self._rows_filter)
+
+  # Sums of VALUE columns with given extras (all VALUE columns if none are given)
+  # by groups of group_by(), in a single pass over the filtered rows.
+  # The result is a collapsed cluster with a DATE column of first days of the
+  # date units (if grouped by dates), the VALUE columns, and an ID column (if grouped by IDs).
+  # Without group_by() the rows are collapsed by their dates and IDs.
+  # None if the stats file doesn't exist.
+  def sum(self, *values_extras):
+    stats_cluster = self.cluster()
+    if stats_cluster is None:
+      return None
+    metadata = stats_cluster.metadata()
+    values_indexes = __values_indexes_of(metadata, values_extras)
+    group_keys = self._group_keys if self._group_keys is not None else ['day', _ID_KEY]
+    units = [_UNITS_BY_KEYS.get(key, key) for key in group_keys if key != _ID_KEY]
+    unit = units[0] if len(units) > 0 else None
+    by_ids = _ID_KEY in group_keys
+    schema = metadata.schema()
+    date_indx = schema.index_of(StatColumnType.DATE)
+    id_indx = schema.index_of(StatColumnType.ID)
+    # The default grouping is by the columns the cluster has
+    if unit is not None and date_indx is None:
+      if self._group_keys is not None:
+        raise ValueError('Cannot group by dates without DATE column: {}'.format(metadata))
+      unit = None
+    if by_ids and id_indx is None:
+      if self._group_keys is not None:
+        raise ValueError('Cannot group by IDs without ID column: {}'.format(metadata))
+      by_ids = False
+
+    columns = stats_cluster._to_columns()
+    days = columns.raw_column_at(date_indx) if unit is not None else None
+    id_codes = columns.raw_column_at(id_indx) if by_ids else None
+    values = [columns.raw_column_at(indx) for indx in values_indexes]
+    # Days to first days of their units, days of a file repeat a lot
+    periods = {}
+    sums = {}
+    for row in range(len(columns)):
+      period = None
+      if days is not None:
+        day = days[row]
+        period = periods.get(day)
+        if period is None:
+          period = __period_of(day, unit)
+          periods[day] = period
+      key = (period, id_codes[row] if id_codes is not None else None)
+      row_sums = sums.get(key)
+      if row_sums is None:
+        sums[key] = [column[row] for column in values]
+      else:
+        for indx, column in enumerate(values):
+          row_sums[indx] += column[row]
+
+    types = [StatColumnType.VALUE for indx in values_indexes]
+    types_extras = [metadata.types_extras_view()[indx] for indx in values_indexes]
+    if unit is not None:
+      types = [StatColumnType.DATE] + types
+      types_extras = [None] + types_extras
+    if by_ids:
+      types.append(StatColumnType.ID)
+      types_extras.append(metadata.types_extras_view()[id_indx])
+    builder = StatsClusterBuilder(StatsMetadata(types, types_extras))
+    ids_dictionary = columns.ids_dictionary()
+    for (period, id_code), row_sums in sums.items():
+      row = list(row_sums)
+      if unit is not None:
+        row = [DateCodec.day_to_date(period)] + row
+      if by_ids:
+        row.append(ids_dictionary.id_of(id_code))
+      builder.add(row)
+    return builder.build()
+
+def _StatsQuery__values_indexes_of(metadata, values_extras):
+  values_indexes = metadata.schema().indexes_of(StatColumnType.VALUE)
+  if len(values_extras) == 0:
+    return list(values_indexes)
+  types_extras = metadata.types_extras_view()
+  result = []
+  for value_extra in values_extras:
+    indexes = [indx for indx in values_indexes if types_extras[indx] == value_extra]
+    if len(indexes) != 1:
+      raise ValueError('No single VALUE column {} in {}'.format(value_extra, metadata))
+    result.append(indexes[0])
+  return result
+
+def _StatsQuery__period_of(day, unit):
+  if unit is PeriodChartModifier.Unit.DAY:
+    return day
+  day_date = date.fromordinal(day)
+  if unit is PeriodChartModifier.Unit.MONTH:
+    return date(day_date.year, day_date.month, 1).toordinal()
+  if unit is PeriodChartModifier.Unit.YEAR:
+    return date(day_date.year, 1, 1).toordinal()
+  raise ValueError('Unknown time unit: {}'.format(unit))
@@ -0,0 +1,76 @@
+import unittest
+from core import test_utils
+
+from datetime import datetime
+
+from core.stats.stats_query import query
+from core.stats.stats_cluster import StatsCluster
+from core.stats.stats_entry import StatsEntry
+from core.stats.stats_metadata import StatsMetadata
+from core.chart.modifiers.period_chart_modifier import PeriodChartModifier
+
+STATS = ('date;value:sp;value:count;id\n'
+         + '05/04/2019;1;1;a\n06/05/2019;2;1;a\n07/05/2019;3;1;b\n08/05/2019;3;1;a\n01/01/2020;5;1;b')
+
+class StatsQueryTests(unittest.TestCase):
+  def test_sum_by_months_and_ids(self):
+    result = query(StatsCluster.from_str(STATS)).group_by('month', 'id').sum('sp')
+    self.assertEqual(StatsMetadata.from_str('date;value:sp;id'), result.metadata())
+    self.assertTrue(result.is_collapsed())
+    self.assertEqual([StatsEntry.from_str('01/01/2020;5;b'),
+                      StatsEntry.from_str('01/05/2019;5;a'),
+                      StatsEntry.from_str('01/05/2019;3;b'),
+                      StatsEntry.from_str('01/04/2019;1;a')], result.entries())
+
+  def test_sum_by_years_of_filtered_rows(self):
+    result = (query(StatsCluster.from_str(STATS))
+              .where(start_date=datetime(2019, 5, 1))
+              .where(end_date=datetime(2019, 12, 31))
+              .group_by(PeriodChartModifier.Unit.YEAR)
+              .sum())
+    self.assertEqual(StatsMetadata.from_str('date;value:sp;value:count'), result.metadata())
+    self.assertEqual([StatsEntry.from_str('01/01/2019;8;3')], result.entries())
+
+  def test_sum_without_grouping_collapses(self):
+    result = query(StatsCluster.from_str(STATS + '\n08/05/2019;1;1;a')).where(ids=['a']).sum('count')
+    self.assertEqual([StatsEntry.from_str('08/05/2019;2;a'),
+                      StatsEntry.from_str('06/05/2019;1;a'),
+                      StatsEntry.from_str('05/04/2019;1;a')], result.entries())
+
+  def test_sum_without_grouping_of_cluster_without_dates(self):
+    result = query(StatsCluster.from_str('value;id\n1;a\n2;b\n3;a')).sum()
+    self.assertEqual(StatsMetadata.from_str('value;id'), result.metadata())
+    self.assertEqual([StatsEntry.from_str('4;a'), StatsEntry.from_str('2;b')], result.entries())
+
+    exception_caught = False
+    try:
+      query(StatsCluster.from_str('value;id\n1;a')).group_by('month').sum()
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_total_sum(self):
+    result = query(StatsCluster.from_str(STATS)).group_by().sum('count', 'sp')
+    self.assertEqual([StatsEntry.from_str('5;14')], result.entries())
+
+  def test_query_of_file(self):
+    file_path = test_utils.make_file_and_write(test_utils.make_tmp_dir(), STATS)
+    result = query(file_path).where(ids=['b']).group_by('id').sum('sp')
+    self.assertEqual([StatsEntry.from_str('8;b')], result.entries())
+    self.assertIsNone(query(file_path + '.missing').sum())
+
+  def test_throws_on_unknown_value(self):
+    exception_caught = False
+    try:
+      query(StatsCluster.from_str(STATS)).sum('hours')
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_throws_on_unknown_group_key(self):
+    exception_caught = False
+    try:
+      query(StatsCluster.from_str(STATS)).group_by('week')
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
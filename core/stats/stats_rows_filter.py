@@ -0,0 +1,72 @@
+from core.stats.stat_column_type import StatColumnType
+from core.stats.date_codec import DateCodec
+
+# Dates range (both dates inclusive, any of them can be None for an open range)
+# and optional IDs of stats rows to keep, same as in StatsCluster.slice().
+# The filter can be checked against not parsed columns of text rows (see
+# strs_predicate()), so that loaders skip rows before parsing them.
+# Filtering commutes with merging and collapsing, because both of them
+# keep entries with different dates and IDs apart.
+class StatsRowsFilter:
+  def __init__(self, start_date=None, end_date=None, ids=None):
+    self.start_date = start_date
+    self.end_date = end_date
+    self.ids = frozenset(ids) if ids is not None else None
+
+  def is_empty(self):
+    return self.start_date is None and self.end_date is None and self.ids is None
+
+  # Filter of rows which pass both filters
+  def intersect(self, other):
+    start_date = self.start_date
+    if start_date is None or (other.start_date is not None and other.start_date > start_date):
+      start_date = other.start_date
+    end_date = self.end_date
+    if end_date is None or (other.end_date is not None and other.end_date < end_date):
+      end_date = other.end_date
+    ids = self.ids
+    if ids is None or other.ids is not None:
+      ids = other.ids if ids is None else ids & other.ids
+    return StatsRowsFilter(start_date, end_date, ids)
+
+  # Function of not typed columns of a row with given schema, which tells
+  # whether the row passes the filter. Only DATE and ID columns are looked at,
+  # rows with wrong number of columns pass, so that their parsing reports them.
+  def strs_predicate(self, schema):
+    date_indx = schema.index_of(StatColumnType.DATE)
+    id_indx = schema.index_of(StatColumnType.ID)
+    self.__validate(date_indx, id_indx, schema)
+    start_day = DateCodec.date_to_day(self.start_date) if self.start_date is not None else None
+    end_day = DateCodec.date_to_day(self.end_date) if self.end_date is not None else None
+    ids = self.ids
+    size = len(schema)
+
+    def predicate(columns):
+      if len(columns) != size:
+        return True
+      if ids is not None and columns[id_indx] not in ids:
+        return False
+      if start_day is not None or end_day is not None:
+        day = DateCodec.str_to_day(columns[date_indx])
+        if start_day is not None and day < start_day:
+          return False
+        if end_day is not None and day > end_day:
+          return False
+      return True
+    return predicate
+
+  # Rows of an already loaded cluster which pass the filter, a view of it
+  def apply(self, stats_cluster):
+    if self.is_empty():
+      return stats_cluster
+    return stats_cluster.slice(self.start_date, self.end_date, self.ids)
+
+  def __validate(self, date_indx, id_indx, schema):
+    if (self.start_date is not None or self.end_date is not None) and date_indx is None:
+      raise ValueError('Cannot filter rows without dates by dates: {}'.format(schema))
+    if self.ids is not None and id_indx is None:
+      raise ValueError('Cannot filter rows without IDs by IDs: {}'.format(schema))
+
+  def __str__(self):
+    return 'StatsRowsFilter(start_date={}, end_date={}, ids={})'.format(
+      self.start_date, self.end_date, sorted(self.ids) if self.ids is not None else None)
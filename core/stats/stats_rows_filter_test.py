@@ -0,0 +1,50 @@
+import unittest
+
+from datetime import datetime
+
+from core.stats.stats_rows_filter import StatsRowsFilter
+from core.stats.stats_metadata import StatsMetadata
+from core.stats.stats_cluster import StatsCluster
+
+class StatsRowsFilterTests(unittest.TestCase):
+  def test_strs_predicate(self):
+    schema = StatsMetadata.from_str('date;value;id').schema()
+    predicate = StatsRowsFilter(datetime(2019, 4, 6), datetime(2019, 4, 7), ['a']).strs_predicate(schema)
+    self.assertTrue(predicate(['06/04/2019', '1', 'a']))
+    self.assertTrue(predicate(['07/04/2019', '1', 'a']))
+    self.assertFalse(predicate(['05/04/2019', '1', 'a']))
+    self.assertFalse(predicate(['08/04/2019', '1', 'a']))
+    self.assertFalse(predicate(['06/04/2019', '1', 'b']))
+    # Rows with wrong number of columns are left to the parser
+    self.assertTrue(predicate(['05/04/2019', '1']))
+
+  def test_predicate_is_same_as_apply(self):
+    stats_cluster = StatsCluster.from_str('date;value;id\n05/04/2019;1;a\n06/04/2019;2;b\n07/04/2019;3;a')
+    rows_filter = StatsRowsFilter(None, datetime(2019, 4, 6, 12), ['a', 'b'])
+    predicate = rows_filter.strs_predicate(stats_cluster.metadata().schema())
+    self.assertEqual([entry for entry in stats_cluster.entries() if predicate(entry.columns)],
+                     rows_filter.apply(stats_cluster).entries())
+
+  def test_intersect(self):
+    first = StatsRowsFilter(datetime(2019, 4, 6), None, ['a', 'b'])
+    second = StatsRowsFilter(datetime(2019, 4, 5), datetime(2019, 4, 7), ['b', 'c'])
+    intersection = first.intersect(second)
+    self.assertEqual(datetime(2019, 4, 6), intersection.start_date)
+    self.assertEqual(datetime(2019, 4, 7), intersection.end_date)
+    self.assertEqual(frozenset(['b']), intersection.ids)
+    self.assertTrue(StatsRowsFilter().intersect(StatsRowsFilter()).is_empty())
+
+  def test_throws_if_no_filtered_columns(self):
+    exception_caught = False
+    try:
+      StatsRowsFilter(ids=['a']).strs_predicate(StatsMetadata.from_str('date;value').schema())
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+    exception_caught = False
+    try:
+      StatsRowsFilter(start_date=datetime(2019, 4, 6)).strs_predicate(StatsMetadata.from_str('value;id').schema())
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
@@ -0,0 +1,65 @@
+from core.stats.stat_column_type import StatColumnType
+
+# Column positions of given types, resolved once.
+# Schemas are immutable and are shared by all entries with same types,
+# use StatsSchema.of() to get one.
+class StatsSchema:
+  _compiled = {}
+
+  def __init__(self, types):
+    self._types = tuple(types)
+    self._indexes = {}
+    for stat_column_type in StatColumnType:
+      self._indexes[stat_column_type] = ()
+    for indx, stat_column_type in enumerate(self._types):
+      if not isinstance(stat_column_type, StatColumnType):
+        raise ValueError('Unexpected StatColumnType: {}'.format(stat_column_type))
+      self._indexes[stat_column_type] += (indx,)
+
+  @staticmethod
+  def of(types):
+    if isinstance(types, StatsSchema):
+      return types
+    key = tuple(types)
+    schema = StatsSchema._compiled.get(key)
+    if schema is None:
+      schema = StatsSchema(key)
+      StatsSchema._compiled[key] = schema
+    return schema
+
+  def __len__(self):
+    return len(self._types)
+
+  def types(self):
+    return list(self._types)
+
+  # Same as types(), but a tuple, without copying
+  def types_view(self):
+    return self._types
+
+  def type_at(self, indx):
+    return self._types[indx]
+
+  def indexes_of(self, stat_column_type):
+    return self._indexes[stat_column_type]
+
+  # Index of the only column of given type, None if there's no such column.
+  def index_of(self, stat_column_type):
+    indexes = self._indexes[stat_column_type]
+    if len(indexes) == 1:
+      return indexes[0]
+    if len(indexes) == 0:
+      return None
+    raise ValueError('Number of columns with type {} != 1. Indexes: {}, types: {}'.format(
+      stat_column_type, list(indexes), list(self._types)))
+
+  def __eq__(self, other):
+    if isinstance(other, StatsSchema):
+      return self._types == other._types
+    return False
+
+  def __hash__(self):
+    return hash(self._types)
+
+  def __str__(self):
+    return ';'.join([str(stat_column_type) for stat_column_type in self._types])
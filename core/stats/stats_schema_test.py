@@ -0,0 +1,38 @@
+import unittest
+
+from core.stats.stats_schema import StatsSchema
+from core.stats.stat_column_type import StatColumnType
+
+class StatsSchemaTests(unittest.TestCase):
+  def test_resolves_columns_positions(self):
+    schema = StatsSchema([StatColumnType.DATE, StatColumnType.VALUE, StatColumnType.ID, StatColumnType.VALUE])
+    self.assertEqual(0, schema.index_of(StatColumnType.DATE))
+    self.assertEqual(2, schema.index_of(StatColumnType.ID))
+    self.assertEqual(None, schema.index_of(StatColumnType.COMMENT))
+    self.assertEqual((1, 3), schema.indexes_of(StatColumnType.VALUE))
+    self.assertEqual(StatColumnType.ID, schema.type_at(2))
+    self.assertEqual(4, len(schema))
+
+  def test_throws_when_several_columns_of_type_requested(self):
+    schema = StatsSchema([StatColumnType.DATE, StatColumnType.VALUE, StatColumnType.VALUE])
+    exception_caught = False
+    try:
+      schema.index_of(StatColumnType.VALUE)
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_throws_when_not_a_column_type(self):
+    exception_caught = False
+    try:
+      StatsSchema([StatColumnType.DATE, 'value'])
+    except ValueError:
+      exception_caught = True
+    self.assertTrue(exception_caught)
+
+  def test_same_types_share_schema(self):
+    schema1 = StatsSchema.of([StatColumnType.DATE, StatColumnType.VALUE])
+    schema2 = StatsSchema.of([StatColumnType.DATE, StatColumnType.VALUE])
+    self.assertTrue(schema1 is schema2)
+    self.assertTrue(schema1 is StatsSchema.of(schema1))
+    self.assertEqual('date;value', str(schema1))
@@ -2,22 +2,22 @@ from datetime import datetime
 
 from core.stats.stats_entry import StatsEntry
 from core.stats.stat_column_type import StatColumnType
+from core.stats.stats_schema import StatsSchema
+from core.stats.date_codec import DateCodec
 
-def _TypedStatsEntry__normalize_date(date):
-  # Remove hours, minutes, seconds, etc
-  return _TypedStatsEntry__str_to_date(_TypedStatsEntry__date_to_str(date))
-
-def _TypedStatsEntry__date_to_str(date):
-  return date.strftime('%d/%m/%Y')
-
-def _TypedStatsEntry__str_to_date(date_str):
-  return datetime.strptime(date_str, '%d/%m/%Y')
+# Formats a VALUE column. Integral values are written without a fraction,
+# other values with 15 significant digits, so that noise of summed
+# fractions (e.g. 0.1 + 0.2) is not written.
+def format_value(value):
+  if float(value).is_integer() and abs(value) < 1e15:
+    return '%d'%(value)
+  return '%.15g'%(value)
 
 def _TypedStatsEntry__typed_column_to_str(stat_column_type, typed_column):
   if stat_column_type is StatColumnType.DATE:
     if not isinstance(typed_column, datetime):
       raise ValueError('Value {} was expected to be a datetime'.format(typed_column))
-    return _TypedStatsEntry__date_to_str(typed_column)
+    return DateCodec.date_to_str(typed_column)
   elif stat_column_type is StatColumnType.ID or stat_column_type is StatColumnType.COMMENT:
     if not isinstance(typed_column, str):
       raise ValueError('Value {} was expected to be a str'.format(typed_column))
@@ -25,63 +25,97 @@ def _TypedStatsEntry__typed_column_to_str(stat_column_type, typed_column):
   elif stat_column_type is StatColumnType.VALUE:
     if not isinstance(typed_column, float) and not isinstance(typed_column, int):
       raise ValueError('Value {} was expected to be a float or int'.format(typed_column))
-    return '%g'%(typed_column)
+    return format_value(typed_column)
   else:
     raise ValueError('Unexpected type {} for column {}'.format(stat_column_type, typed_column))
 
+def _TypedStatsEntry__str_to_typed_column(stat_column_type, column):
+  if stat_column_type is StatColumnType.DATE:
+    return DateCodec.str_to_date(column)
+  elif stat_column_type is StatColumnType.ID or stat_column_type is StatColumnType.COMMENT:
+    return column
+  elif stat_column_type is StatColumnType.VALUE:
+    return float(column)
+  else:
+    raise ValueError('Unexpected StatColumnType: {}'.format(stat_column_type))
+
+# Marks typed columns which are not parsed yet
+_TypedStatsEntry__NOT_PARSED = object()
+
+# Stats entry with typed access to its columns.
+# Each column is parsed only once, on first access, and then cached
+# next to the not typed (string) column.
 class TypedStatsEntry:
+  __slots__ = ('not_typed', '_schema', '_typed_columns')
+
+  # Types are either a list of StatColumnType or an already compiled StatsSchema
   def __init__(self, stats_entry, types):
-    if not isinstance(types, list):
+    if not isinstance(types, list) and not isinstance(types, StatsSchema):
       raise ValueError('Types are expected to be a list, but is {}'.format(type(types)))
     self.not_typed = stats_entry
-    self.types = types
+    self._schema = StatsSchema.of(types)
+    self._typed_columns = None
+
+  # Creates an entry with already parsed columns, the columns must
+  # match the not typed entry.
+  @staticmethod
+  def _from_typed_columns(stats_entry, schema, typed_columns):
+    entry = TypedStatsEntry(stats_entry, schema)
+    entry._typed_columns = typed_columns
+    return entry
+
+  @property
+  def types(self):
+    return self._schema.types()
+
+  def schema(self):
+    return self._schema
 
   @staticmethod
   def from_stats(stat_column_types, typed_columns):
+    schema = StatsSchema.of(stat_column_types)
     columns = []
+    parsed_columns = []
     for indx, typed_column in enumerate(typed_columns):
-      columns.append(__typed_column_to_str(stat_column_types[indx], typed_column))
-    return TypedStatsEntry(StatsEntry(columns), stat_column_types)
+      stat_column_type = schema.type_at(indx)
+      column = __typed_column_to_str(stat_column_type, typed_column)
+      columns.append(column)
+      if stat_column_type is StatColumnType.DATE:
+        parsed_columns.append(DateCodec.truncate_to_day(typed_column))
+      elif stat_column_type is StatColumnType.VALUE:
+        parsed_columns.append(float(typed_column))
+      else:
+        parsed_columns.append(typed_column)
+    return TypedStatsEntry._from_typed_columns(StatsEntry(columns), schema, parsed_columns)
 
   def value(self):
-    result = self.__get_column_of_type(StatColumnType.VALUE)
-    if result is None:
-      return None
-    return float(result)
+    return self.__at_type(StatColumnType.VALUE)
 
   def comment(self):
-    return self.__get_column_of_type(StatColumnType.COMMENT)
+    return self.__at_type(StatColumnType.COMMENT)
 
   def id(self):
-    return self.__get_column_of_type(StatColumnType.ID)
+    return self.__at_type(StatColumnType.ID)
 
   def date(self):
-    result = self.__get_column_of_type(StatColumnType.DATE)
-    if result is None:
-      return None
-    return __str_to_date(result)
-
-  def __get_column_of_type(self, stat_column_type):
-    indexes = []
-    for indx, curr_stat_column_type in enumerate(self.types):
-      if curr_stat_column_type is stat_column_type:
-        indexes.append(indx)
-    if len(indexes) == 0:
+    return self.__at_type(StatColumnType.DATE)
+
+  def __at_type(self, stat_column_type):
+    indx = self._schema.index_of(stat_column_type)
+    if indx is None:
       return None
-    if len(indexes) > 1:
-      raise ValueError('Number of columns with type {} != 1. Indexes: {}, types: {}'.format(stat_column_type, indexes, self.types))
-    return self.not_typed.columns[indexes[0]]
+    return self.at(indx)
 
   def at(self, indx):
-    stat_column_type = self.types[indx]
-    if stat_column_type is StatColumnType.DATE:
-      return __str_to_date(self.not_typed.columns[indx])
-    elif stat_column_type is StatColumnType.ID or stat_column_type is StatColumnType.COMMENT:
-      return self.not_typed.columns[indx]
-    elif stat_column_type is StatColumnType.VALUE:
-      return float(self.not_typed.columns[indx])
-    else:
-      raise ValueError('Unexpected StatColumnType: {}'.format(stat_column_type))
+    typed_columns = self._typed_columns
+    if typed_columns is None:
+      typed_columns = [__NOT_PARSED] * len(self._schema)
+      self._typed_columns = typed_columns
+    typed_column = typed_columns[indx]
+    if typed_column is __NOT_PARSED:
+      typed_column = __str_to_typed_column(self._schema.type_at(indx), self.not_typed.columns[indx])
+      typed_columns[indx] = typed_column
+    return typed_column
 
   def __str__(self):
-    return str(self.not_typed)
\ No newline at end of file
+    return str(self.not_typed)
@@ -65,3 +65,20 @@ class TypedStatsEntryTests(unittest.TestCase):
     self.assertNotEqual(None, typed_stats_entry.value())
     self.assertNotEqual(None, typed_stats_entry.id())
     self.assertEqual(None, typed_stats_entry.comment())
+
+  def test_columns_are_parsed_once(self):
+    types = [StatColumnType.DATE, StatColumnType.VALUE, StatColumnType.ID]
+    typed_stats_entry = TypedStatsEntry(StatsEntry.from_str('06/04/2019;123;hello'), types)
+    self.assertTrue(typed_stats_entry.date() is typed_stats_entry.at(0))
+    self.assertTrue(typed_stats_entry.value() is typed_stats_entry.at(1))
+    self.assertFalse(hasattr(typed_stats_entry, '__dict__'))
+
+  def test_creating_from_stats(self):
+    types = [StatColumnType.DATE, StatColumnType.VALUE, StatColumnType.ID]
+    typed_stats_entry = TypedStatsEntry.from_stats(types, [datetime(2019, 4, 6, 13, 40), 2, 'hello'])
+
+    self.assertEqual('06/04/2019;2;hello', str(typed_stats_entry))
+    self.assertEqual(datetime(2019, 4, 6), typed_stats_entry.date())
+    self.assertTrue(isinstance(typed_stats_entry.value(), float))
+    self.assertEqual(2, typed_stats_entry.value())
+    self.assertEqual(types, typed_stats_entry.types)
@@ -5,21 +5,20 @@ import sys
 import os
 import subprocess
 
-from plotly.offline import plot
-import plotly.graph_objs as graph_objs
-
 import core.stats.stats_file_utils as stats_file_utils
-from core.stats.stats_entry import StatsEntry
-from core.chart.chart_data import ChartData
-from core.chart.charts_family import *
+from core.chart.charts_family import ChartsFamily
+
+# plotly takes most of the startup time, so it's imported only when charts are made
+def file_to_html_chart(path, use_cache=False):
+  from plotly.offline import plot
+  import plotly.graph_objs as graph_objs
 
-def file_to_html_chart(path):
-  cluster = stats_file_utils.load_from(path)
+  cluster = stats_file_utils.load_from(path, use_cache=use_cache)
   cvs_file_name = os.path.basename(path)
   charts_family = ChartsFamily(cluster, title_base=cvs_file_name)
 
   cvs_graph_objs_dict = {}
-  for chart_data in charts_family.charts_data():
+  for chart_data in charts_family.iter_charts_data():
     cvs_graph_objs = []
     for line in chart_data.lines():
       cvs_graph_objs_dict[chart_data.title()] = cvs_graph_objs
@@ -52,6 +51,8 @@ def file_to_html_chart(path):
   subprocess.check_call(['xdg-open', out_path])
 
 def stats_entries_to_graph_objs(stats_entries):
+  import plotly.graph_objs as graph_objs
+
   separated_stats = {}
   for entry in stats_entries:
     if entry.description not in separated_stats:
@@ -68,8 +69,10 @@ def main(argv):
   parser = argparse.ArgumentParser(description='Transforms given cvs files into html charts')
   parser.add_argument('--cvs', required=True,
                       help='Paths to cvs file which will be transformed into chart')
+  parser.add_argument('--cache', action='store_true', help='Keep the parsed cvs file in a cache file next to it, ' +
+                                                           'so that it\'s not parsed again until it\'s changed')
   options = parser.parse_args()
-  file_to_html_chart(options.cvs)
+  file_to_html_chart(options.cvs, options.cache)
 
 if __name__ == '__main__':
   sys.exit(main(sys.argv[1:]))
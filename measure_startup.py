@@ -0,0 +1,59 @@
+#!/usr/bin/env python3.7
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Scripts which are expected to start fast, each is imported as a module
+ENTRY_POINTS = [
+  'commits_to_cvs',
+  'compact_stats_journal',
+  'convert_stats_file',
+  'cvs_to_chart',
+  'tg_chat_history_to_cvs',
+  'ya_tickets_to_cvs',
+]
+# Modules which must be imported only when they're used, not at startup
+DEFERRED_MODULES = ['yaml', 'plotly', 'gzip', 'hashlib']
+
+# Returns a dict of imported modules names and their cumulative import times
+# in microseconds, measured with 'python -X importtime' in a new process
+def measure_imports(module):
+  result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)],
+                          cwd=os.path.dirname(os.path.abspath(__file__)),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          encoding='UTF-8', check=True)
+  imports = {}
+  for line in result.stderr.splitlines():
+    if not line.startswith('import time:'):
+      continue
+    columns = line[len('import time:'):].split('|')
+    if len(columns) != 3 or not columns[1].strip().isdigit():
+      continue
+    imports[columns[2].strip()] = int(columns[1])
+  return imports
+
+def main(argv):
+  parser = argparse.ArgumentParser(description='Measures import time of the scripts, fails if a script ' +
+                                               'imports a module which must be deferred, or imports too long')
+  parser.add_argument('--limit-ms', type=int, help='Max import time of a script in milliseconds. ' +
+                                                   'By default, there\'s no limit')
+  options = parser.parse_args()
+
+  failed = False
+  for entry_point in ENTRY_POINTS:
+    imports = measure_imports(entry_point)
+    import_time_ms = imports[entry_point] / 1000
+    deferred_imports = [module for module in DEFERRED_MODULES if module in imports]
+    print('{}: {:.1f} ms'.format(entry_point, import_time_ms))
+    if len(deferred_imports) > 0:
+      print('  imports deferred modules: {}'.format(', '.join(deferred_imports)))
+      failed = True
+    if options.limit_ms is not None and import_time_ms > options.limit_ms:
+      print('  exceeds the limit of {} ms'.format(options.limit_ms))
+      failed = True
+  return 1 if failed else 0
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv[1:]))
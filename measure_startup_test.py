@@ -0,0 +1,16 @@
+import unittest
+
+from measure_startup import ENTRY_POINTS
+from measure_startup import DEFERRED_MODULES
+from measure_startup import measure_imports
+
+class MeasureStartupTests(unittest.TestCase):
+  def test_entry_points_dont_import_deferred_modules(self):
+    for entry_point in ENTRY_POINTS:
+      imports = measure_imports(entry_point)
+      self.assertTrue(entry_point in imports)
+      for module in DEFERRED_MODULES:
+        self.assertFalse(module in imports, '{} imports {}'.format(entry_point, module))
+
+  def test_stats_metadata_doesnt_import_yaml(self):
+    self.assertFalse('yaml' in measure_imports('core.stats.stats_metadata'))
@@ -9,10 +9,8 @@ from datetime import datetime
 from datetime import timedelta
 
 from core.stats.stats_entry import StatsEntry
-from core.stats.stats_cluster import StatsCluster
 from core.stats.stats_metadata import StatsMetadata
-from core.stats.typed_stats_entry import TypedStatsEntry
-from core.stats.stat_column_type import StatColumnType
+from core.stats.stats_cluster_builder import StatsClusterBuilder
 import core.stats.stats_file_utils
 
 
@@ -88,18 +86,6 @@ def main(argv):
       if author not in authors_msgs:
         authors_msgs[author] = 0
 
-  entries = []
-  date = earliest_date
-  while date <= latest_date:
-    authors_msgs = messages_by_dates_and_authors[date]
-    for author, msgs in authors_msgs.items():
-      if author not in accepted_authors:
-        continue
-      entry = TypedStatsEntry.from_stats([StatColumnType.DATE, StatColumnType.VALUE, StatColumnType.ID],
-                                         [date,                msgs,                 author])
-      entries.append(entry)
-    date = date + timedelta(days=1)
-
   metadata = StatsMetadata.from_str("""
 ===
 - what: chart
@@ -126,13 +112,23 @@ def main(argv):
   value: date;value;id
 ===
 """)
-  cluster = StatsCluster.from_typed_entries(entries, metadata)
+  builder = StatsClusterBuilder(metadata)
+  date = earliest_date
+  while date <= latest_date:
+    authors_msgs = messages_by_dates_and_authors[date]
+    for author, msgs in authors_msgs.items():
+      if author not in accepted_authors:
+        continue
+      builder.add([date, msgs, author])
+    date = date + timedelta(days=1)
+  cluster = builder.build()
 
   if options.output_file is not None:
     core.stats.stats_file_utils.write_into(options.output_file,
                                 cluster)
   else:
-    print(str(cluster))
+    cluster.write_to(sys.stdout)
+    sys.stdout.write('\n')
 
 if __name__ == '__main__':
   sys.exit(main(sys.argv[1:]))
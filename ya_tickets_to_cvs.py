@@ -4,16 +4,12 @@ import argparse
 import sys
 import re
 import json
-import urllib.request
 
 from datetime import datetime
 
 import core.stats.stats_file_utils
-from core.stats.stats_entry import *
-from core.stats.stats_cluster import *
-from core.stats.stats_metadata import *
-from core.stats.stat_column_type import *
-from core.stats.typed_stats_entry import *
+from core.stats.stats_cluster_builder import StatsClusterBuilder
+from core.stats.stats_metadata import StatsMetadata
 
 class Ticket:
   def __init__(self, json_obj):
@@ -34,18 +30,15 @@ class Ticket:
 
 def tickets_to_stats_cluster(tickets):
   metadata = StatsMetadata.from_str('date;value:sp;value:count;id')
-  entries = []
+  builder = StatsClusterBuilder(metadata)
   for ticket in tickets:
     resolution_date = ticket.get_get_resolution_date()
     if resolution_date is None:
       continue
     # The 1 value will be collapsed with tickets in the same day anyway
     columns_values = [resolution_date, ticket.get_sp(), 1, ticket.get_assignee()]
-    entry = TypedStatsEntry.from_stats(metadata.types(), columns_values)
-    entries.append(entry)
-
-  entries = sorted(entries, key=lambda entry: entry.date())
-  return StatsCluster.from_typed_entries(entries, metadata).collapse()
+    builder.add(columns_values)
+  return builder.build()
 
 def main(argv):
   parser = argparse.ArgumentParser(description='Produces tickets count and SP resolves stats')
@@ -54,8 +47,16 @@ def main(argv):
   parser.add_argument('--backups-dir', help='Path to dir where the script will put backups of the output-file if ' +
                                             'output-file already exists.')
   parser.add_argument('--backups-limit', type=int, help='Max number of backup files. By default, there\'s not limit')
+  parser.add_argument('--journal', action='store_true', help='If output-file already exists, append the output ' +
+                                                             'to its journal instead of rewriting the whole file. ' +
+                                                             'The journal is folded back into the file when it grows ' +
+                                                             'too big, or by compact_stats_journal.py.')
+  parser.add_argument('--compress-backups', action='store_true', help='Gzip backup files. Backups with same ' +
+                                                                     'contents are shared anyway.')
   parser.add_argument('--assignees', required=True, nargs='*', help='List assignees')
   options = parser.parse_args()
+  # Imported after the arguments are parsed, because it's slow to import
+  import urllib.request
 
   url = "https://st-api.yandex-team.ru/v2/issues?filter=queue:ABRO&filter=assignee:{}&perPage=100&page={}"
   hdr = { 'Authorization' : 'OAuth {}'.format(options.oauth) }
@@ -85,9 +86,12 @@ def main(argv):
     core.stats.stats_file_utils.write_into(options.output_file,
                                 stats_cluster,
                                 options.backups_dir,
-                                options.backups_limit)
+                                options.backups_limit,
+                                options.journal,
+                                options.compress_backups)
   else:
-    print(str(stats_cluster))
+    stats_cluster.write_to(sys.stdout)
+    sys.stdout.write('\n')
 
 if __name__ == '__main__':
   sys.exit(main(sys.argv[1:]))